@@ -0,0 +1,10 @@
+# Load .env before any app module reads its configuration.
+# Production images get their environment from the task definition,
+# so python-dotenv is not even imported there.
+
+import os
+
+if os.getenv("APP_ENV", "development") != "production":
+    from dotenv import load_dotenv
+
+    load_dotenv()
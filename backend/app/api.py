@@ -1,20 +1,31 @@
 # API router, endpoints
 
-import asyncio
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 import app.services as services
+from app.circuit import CircuitOpenError
+from app.insights import InsightGenerationError, InsightLimitExceeded
+from app.ratelimit import client_key, trusted_proxies_from_env
+from app.stream import change_feed, format_sse
 
 from app.schemas import (
     PaginatedResponse,
     Person,
     Planet,
     SortFields,
-    SortOrder)
+    SortOrder,
+    Suggestions)
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
 router = APIRouter()
 
+# Seconds between keep-alive comments on idle /stream connections
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Same proxies the rate limiter trusts for X-Forwarded-For
+TRUSTED_PROXIES = trusted_proxies_from_env()
+
 
 @router.get("/")
 async def read_root():
@@ -25,10 +36,26 @@ async def read_root():
 
 
 @router.get("/health", tags=["Health Check"])
+@router.get("/health/live", tags=["Health Check"])
 async def health_check():
+    """
+    Liveness: the process is up and serving requests.
+    """
     return {"status": "ok"}
 
 
+@router.get("/health/ready", tags=["Health Check"])
+async def readiness_check():
+    """
+    Readiness: 200 once the readiness collections are warm, 503 before.
+    Reports only local state and never calls SWAPI.
+    """
+    report = await services.readiness()
+    if report["status"] != "ready":
+        return JSONResponse(report, status_code=503)
+    return report
+
+
 # ----------------------------------------
 # Fetches a paginated, searchable, and sortable list of people from SWAPI.
 # ----------------------------------------
@@ -49,26 +76,8 @@ async def get_people(
         descending=(order == SortOrder.desc),
     )
 
-    # Extract unique homeworld URLs
-    unique_homeworlds = {
-        person.get("homeworld") for person in data["results"]
-        if person.get("homeworld")
-    }
-
-    # Fetch each homeworld in parallel using fetch by URL service
-    # This avoids fetching the same homeworld multiple times
-    homeworld_map = {}
-    tasks = [
-        services.fetch_swapi_resource_by_url(url)
-        for url in unique_homeworlds
-    ]
-
-    # Execute all fetches concurrently
-    results = await asyncio.gather(*tasks)
-
     # Build a mapping of homeworld URL → homeworld name
-    for url, result in zip(unique_homeworlds, results):
-        homeworld_map[url] = result.get("name") if result else "Unknown"
+    homeworld_map = await services.fetch_homeworld_names(data["results"])
     print(homeworld_map)
     # Inject the resolved homeworld name into each person
     for person in data["results"]:
@@ -96,18 +105,191 @@ async def get_planets(
     return data
 
 
+async def _insight_entity(name: str) -> Tuple[Dict[str, Any], bool]:
+    # Resolve the full record so the insight cache is keyed on its
+    # content; fall back to the bare name if it can't be resolved.
+    # Only resolved records are cacheable: any string can be sent as
+    # a name, and caching those would let clients grow memory freely.
+    import httpx
+
+    try:
+        entity = await services.find_record_by_name(name)
+    except (httpx.HTTPError, CircuitOpenError) as e:
+        print(f"Could not resolve {name} for AI insight: {e}")
+        entity = None
+    if entity is None:
+        return {"name": name}, False
+    return entity, True
+
+
+def _client_id(request: Request) -> str:
+    return client_key(request.scope, trusted_proxies=TRUSTED_PROXIES)
+
+
+def _too_many_insights() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many AI insights in progress for this client",
+    )
+
+
+# ----------------------------------------
+# Typeahead suggestions: names only, ranked prefix > word > substring.
+# Served from the index built with each snapshot, no scan per request.
+# ----------------------------------------
+@router.get("/{resource}/suggest", response_model=Suggestions)
+async def suggest(
+        resource: str,
+        q: str = Query(..., max_length=100),
+        limit: int = Query(10, ge=1, le=50),
+        fuzzy: bool = False,
+):
+    if resource not in services.SWAPI_RESOURCES:
+        raise HTTPException(status_code=404, detail="Unknown resource")
+    snapshot = await services.get_snapshot(resource)
+    return {
+        "query": q,
+        "suggestions": snapshot.suggest_index.suggest(q, limit, fuzzy),
+    }
+
+
+# ----------------------------------------
+# Aggregates (count/sum/min/max of numeric fields), overall or per
+# group, e.g. /stats/planets?group_by=climate or
+# /stats/people?group_by=films (people per film).
+# Precomputed with each snapshot, so this is a dict lookup.
+# ----------------------------------------
+@router.get("/stats/{resource}")
+async def get_stats(resource: str, group_by: Optional[str] = None):
+    if resource not in services.SWAPI_RESOURCES:
+        raise HTTPException(status_code=404, detail="Unknown resource")
+    snapshot = await services.get_snapshot(resource)
+    rollups = snapshot.rollups
+
+    data = {
+        "resource": resource,
+        "version": snapshot.version,
+        "count": rollups["count"],
+        "fields": rollups["fields"],
+        "group_by_fields": list(rollups["groups"]),
+    }
+    if group_by is not None:
+        if group_by not in rollups["groups"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid group_by field: {group_by}. "
+                       f"Allowed fields are: {list(rollups['groups'])}",
+            )
+        data["group_by"] = group_by
+        data["groups"] = rollups["groups"][group_by]
+    return data
+
+
 # It takes a required query parameter 'name'
 # representing the person or planet to analyze.
 @router.get("/simulate-ai-insight")
-async def simulate_ai_insight(name: str = Query(
+async def simulate_ai_insight(request: Request, name: str = Query(
+    ...,
+    description="Person or planet name"
+)):
+    entity, cacheable = await _insight_entity(name)
+    try:
+        description = await services.insight_service.generate(
+            entity, _client_id(request), cacheable
+        )
+    except InsightLimitExceeded:
+        raise _too_many_insights()
+    except InsightGenerationError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return {"name": name, "description": description}
+
+
+# Same insight, streamed token by token as Server-Sent Events:
+# `token` events with {"token": ...}, then `done` (or `error`).
+@router.get("/simulate-ai-insight/stream")
+async def stream_ai_insight(request: Request, name: str = Query(
     ...,
     description="Person or planet name"
 )):
-    # This is a quick mock response for demonstration.
-    fake_description = (
-        f"AI Insight for '{name}': "
-        "This entity exhibits fascinating characteristics "
-        "and plays a pivotal role "
-        "in the Star Wars universe according to our advanced simulations."
+    entity, cacheable = await _insight_entity(name)
+    tokens = services.insight_service.stream(
+        entity, _client_id(request), cacheable
+    )
+
+    # Pull the first token before responding so the concurrency
+    # limit can still be reported as a plain 429.
+    try:
+        first: Optional[str] = await tokens.__anext__()
+    except InsightLimitExceeded:
+        raise _too_many_insights()
+    except StopAsyncIteration:
+        first = None
+    except InsightGenerationError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    async def event_source():
+        seq = 0
+        try:
+            if first is not None:
+                seq += 1
+                yield format_sse(seq, {"type": "token", "token": first})
+                async for token in tokens:
+                    seq += 1
+                    yield format_sse(seq, {"type": "token", "token": token})
+            yield format_sse(seq + 1, {"type": "done"})
+        except InsightGenerationError as e:
+            yield format_sse(seq + 1, {"type": "error", "detail": str(e)})
+        finally:
+            await tokens.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ----------------------------------------
+# Server-Sent Events feed of dataset changes.
+# Each event carries one resource's new version plus the records that
+# were added/edited (`changed`) and the URLs that disappeared (`removed`).
+# ----------------------------------------
+@router.get("/stream")
+async def stream_changes(request: Request):
+    # Resume after a reconnect; EventSource sends the last seen id.
+    # An id from another process (restart, other task) can't be
+    # resumed from, so that client is told to resync instead.
+    last_event_id = request.headers.get("last-event-id", "")
+    cursor = change_feed.resume_cursor(last_event_id) \
+        if last_event_id else change_feed.cursor
+    resync = cursor is None
+    if cursor is None:
+        cursor = change_feed.cursor
+
+    async def event_source():
+        nonlocal cursor
+        yield format_sse(change_feed.event_id(cursor), {
+            "type": "versions",
+            "versions": {
+                resource: snapshot.version
+                for resource, snapshot in services.snapshots.items()
+            },
+        })
+        if resync:
+            yield format_sse(change_feed.event_id(cursor), {"type": "resync"})
+        while True:
+            events = await change_feed.wait(
+                cursor, timeout=STREAM_KEEPALIVE_SECONDS
+            )
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for seq, event in events:
+                cursor = seq
+                yield format_sse(change_feed.event_id(seq), event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return {"name": name, "description": fake_description}
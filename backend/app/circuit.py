@@ -0,0 +1,52 @@
+# Circuit breaker guarding calls to the SWAPI upstream
+
+import time
+from typing import Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    - closed: calls go through; failures are counted.
+    - open: after `failure_threshold` consecutive failures, calls fail
+      fast with CircuitOpenError for `reset_timeout` seconds.
+    - half_open: after the timeout, calls are let through again; one
+      success closes the circuit, one failure re-opens it.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30.0,
+            clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            raise CircuitOpenError("SWAPI upstream circuit is open")
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = self._clock()
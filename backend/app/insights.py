@@ -0,0 +1,270 @@
+# AI insight generation: provider interface, caching, batching, streaming
+
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.stream import Broadcaster
+
+# Fields added by this API on top of the SWAPI record.
+# Excluded from the record hash so they don't split the cache.
+DERIVED_FIELDS = {"homeworld_name"}
+
+
+class InsightLimitExceeded(Exception):
+    """Raised when a client already has too many insights in flight."""
+
+
+class InsightGenerationError(Exception):
+    """Raised to subscribers when the provider fails mid-generation."""
+
+
+def record_hash(entity: Dict[str, Any]) -> str:
+    """
+    Content address of an entity: SHA-256 over its canonical JSON.
+    """
+    record = {k: v for k, v in entity.items() if k not in DERIVED_FIELDS}
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def split_tokens(text: str) -> List[str]:
+    # Word-level tokens, keeping trailing whitespace so "".join() round-trips
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class InsightProvider(ABC):
+    """
+    Interface a model backend implements to produce insights.
+
+    Providers receive a whole micro-batch at once and stream tokens back
+    tagged with the index of the entity they belong to, so one model call
+    can serve several concurrent requests.
+    """
+
+    @abstractmethod
+    def stream_batch(
+            self,
+            entities: List[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Yield (entity index, token) pairs for every entity in the batch.
+        """
+
+
+class StubInsightProvider(InsightProvider):
+    """
+    Local provider returning a canned description, token by token.
+    Counts calls so tests can check caching and batching.
+    """
+
+    def __init__(self, token_delay: float = 0.0):
+        self.token_delay = token_delay
+        self.batches = 0
+        self.generated = 0
+
+    @staticmethod
+    def describe(entity: Dict[str, Any]) -> str:
+        return (
+            f"AI Insight for '{entity.get('name')}': "
+            "This entity exhibits fascinating characteristics "
+            "and plays a pivotal role "
+            "in the Star Wars universe according to our advanced simulations."
+        )
+
+    async def stream_batch(self, entities):
+        self.batches += 1
+        self.generated += len(entities)
+        token_lists = [split_tokens(self.describe(e)) for e in entities]
+        # Interleave tokens across the batch like a batched decoder would
+        for position in range(max(map(len, token_lists), default=0)):
+            for index, tokens in enumerate(token_lists):
+                if position < len(tokens):
+                    yield index, tokens[position]
+            await asyncio.sleep(self.token_delay)
+
+
+def load_insight_provider(spec: str) -> InsightProvider:
+    """
+    Build a provider from AI_INSIGHT_PROVIDER: "stub" or "module:Class".
+    """
+    if spec == "stub":
+        return StubInsightProvider()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class InsightService:
+    """
+    Front door for insight generation.
+
+    - Finished insights are cached by record hash, so an unchanged
+      record is generated once. Callers pass cacheable=False for
+      entities that aren't real records, so arbitrary input can't
+      grow the cache.
+    - Concurrent requests for the same record share one generation.
+    - Requests arriving within `batch_window` seconds are grouped into
+      a single provider call of up to `max_batch_size` entities.
+    - Each client may have at most `max_concurrency_per_client`
+      insights streaming at once.
+    """
+
+    def __init__(
+            self,
+            provider: InsightProvider,
+            cache,
+            max_batch_size: int = 8,
+            batch_window: float = 0.01,
+            max_concurrency_per_client: int = 2,
+            token_timeout: float = 30.0,
+            cache_ttl: int = 604800):
+        self.provider = provider
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_concurrency_per_client = max_concurrency_per_client
+        self.token_timeout = token_timeout
+        self.cache_ttl = cache_ttl
+
+        self._inflight: Dict[str, Broadcaster] = {}
+        self._pending: List[
+            Tuple[str, Dict[str, Any], Broadcaster, bool]
+        ] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._active: Dict[str, int] = {}
+
+    async def stream(
+            self,
+            entity: Dict[str, Any],
+            client_id: str,
+            cacheable: bool = True) -> AsyncIterator[str]:
+        """
+        Stream the insight for `entity` token by token. With
+        cacheable=False the result is neither read from nor stored in
+        the cache.
+
+        Raises:
+            InsightLimitExceeded: If `client_id` is at its concurrency
+                limit (raised before any token is produced).
+            InsightGenerationError: If the provider fails.
+        """
+        if self._active.get(client_id, 0) >= self.max_concurrency_per_client:
+            raise InsightLimitExceeded(client_id)
+        self._active[client_id] = self._active.get(client_id, 0) + 1
+        try:
+            key = record_hash(entity)
+            cached = await self.cache.get(self._cache_key(key)) \
+                if cacheable else None
+            if cached is not None:
+                for token in split_tokens(cached):
+                    yield token
+                return
+
+            generation = self._inflight.get(key) or \
+                self._enqueue(key, entity, cacheable)
+            cursor = 0
+            while True:
+                events = await generation.wait(cursor, self.token_timeout)
+                if not events:
+                    raise InsightGenerationError("Insight generation timed out")
+                for cursor, event in events:
+                    if event["type"] == "done":
+                        return
+                    if event["type"] == "error":
+                        raise InsightGenerationError(event["detail"])
+                    yield event["token"]
+        finally:
+            self._active[client_id] -= 1
+            if not self._active[client_id]:
+                del self._active[client_id]
+
+    async def generate(
+            self,
+            entity: Dict[str, Any],
+            client_id: str,
+            cacheable: bool = True) -> str:
+        """
+        Full insight text; same caching and batching as stream().
+        """
+        return "".join(
+            [t async for t in self.stream(entity, client_id, cacheable)]
+        )
+
+    @staticmethod
+    def _cache_key(key: str) -> str:
+        return f"insight:{key}"
+
+    def _enqueue(
+            self,
+            key: str,
+            entity: Dict[str, Any],
+            cacheable: bool) -> Broadcaster:
+        # Unbounded history: late joiners replay the tokens so far.
+        generation = Broadcaster(history=None)
+        self._inflight[key] = generation
+        self._pending.append((key, entity, generation, cacheable))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush
+            )
+        return generation
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(
+            self,
+            batch: List[
+                Tuple[str, Dict[str, Any], Broadcaster, bool]
+            ]) -> None:
+        texts: List[List[str]] = [[] for _ in batch]
+        try:
+            async for index, token in self.provider.stream_batch(
+                    [entity for _, entity, _, _ in batch]):
+                texts[index].append(token)
+                batch[index][2].publish({"type": "token", "token": token})
+            for (key, _, generation, cacheable), parts in zip(batch, texts):
+                if cacheable:
+                    await self.cache.set(
+                        self._cache_key(key), "".join(parts),
+                        ttl=self.cache_ttl,
+                    )
+                generation.publish({"type": "done"})
+        except Exception as e:
+            print(f"Insight generation failed: {e}")
+            for _, _, generation, _ in batch:
+                generation.publish({"type": "error", "detail": str(e)})
+        finally:
+            # Dropped only after the cache is filled, so no request
+            # sees neither and starts a second generation.
+            for key, _, _, _ in batch:
+                self._inflight.pop(key, None)
+
+
+def create_insight_service(cache) -> InsightService:
+    return InsightService(
+        load_insight_provider(os.getenv("AI_INSIGHT_PROVIDER", "stub")),
+        cache=cache,
+        max_batch_size=int(os.getenv("AI_INSIGHT_MAX_BATCH_SIZE", "8")),
+        batch_window=float(os.getenv("AI_INSIGHT_BATCH_WINDOW", "0.01")),
+        max_concurrency_per_client=int(
+            os.getenv("AI_INSIGHT_MAX_CONCURRENCY_PER_CLIENT", "2")
+        ),
+    )
@@ -1,23 +1,49 @@
 # FastAPI app instance and router inclusion
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router
+from app import profiling, ratelimit, services
 
-from dotenv import load_dotenv
+# Lean production mode: no /docs, /redoc or /openapi.json.
+# Elsewhere the OpenAPI schema is still only built on first request.
+PRODUCTION = os.getenv("APP_ENV", "development") == "production"
+
+# Warm the readiness collections in the background at startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup = None
+    if WARMUP_ON_STARTUP:
+        warmup = asyncio.create_task(services.warm_up())
+    yield
+    if warmup is not None:
+        warmup.cancel()
 
-load_dotenv()
 
 app = FastAPI(
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    lifespan=lifespan,
+    docs_url=None if PRODUCTION else "/docs",
+    redoc_url=None if PRODUCTION else "/redoc",
+    openapi_url=None if PRODUCTION else "/openapi.json"
 )
 
 # Allow NGINX and local requests
 origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 
+# Per-client rate limiting and load shedding (see app/ratelimit.py).
+# Added before CORS so that 429/503 responses still carry CORS headers.
+if ratelimit.rate_limit_enabled():
+    app.add_middleware(
+        ratelimit.RateLimitMiddleware,
+        **ratelimit.middleware_options_from_env(services.cache),
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -27,3 +53,8 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix="/api", tags=["API"])
+
+# Opt-in profiling (see app/profiling.py); not installed at all when off
+if profiling.profiling_enabled():
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.include_router(profiling.router, prefix="/api", tags=["Debug"])
@@ -0,0 +1,319 @@
+# Local SQLite mirror of the SWAPI dataset (offline data source)
+
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Columns that hold references to other SWAPI records.
+# Stored in the `links` table so they can be joined and indexed.
+LINK_FIELDS = (
+    "homeworld",
+    "films",
+    "species",
+    "vehicles",
+    "starships",
+    "residents",
+    "people",
+    "planets",
+    "characters",
+    "pilots",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    url TEXT PRIMARY KEY,
+    resource TEXT NOT NULL,
+    name TEXT,
+    created TEXT,
+    edited TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_resource_name
+    ON records(resource, name);
+CREATE INDEX IF NOT EXISTS idx_records_resource_created
+    ON records(resource, created);
+
+CREATE TABLE IF NOT EXISTS links (
+    src_url TEXT NOT NULL REFERENCES records(url) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    dst_url TEXT NOT NULL,
+    PRIMARY KEY (src_url, field, dst_url)
+);
+CREATE INDEX IF NOT EXISTS idx_links_dst ON links(dst_url, field);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL,
+    record_count INTEGER NOT NULL
+);
+"""
+
+# Sort columns map 1:1 to the in-memory ALLOWED_SORT_FIELDS.
+# COALESCE mirrors `item.get(sort_by, "")` in services.sort_items.
+SORT_COLUMNS = {
+    "name": "COALESCE(name, '')",
+    "created": "COALESCE(created, '')",
+}
+
+
+def _py_lower(value: Optional[str]) -> str:
+    # SQLite's lower() only folds ASCII; use Python's so that
+    # search results match services.filter_items_by_name exactly.
+    return value.lower() if value else ""
+
+
+class SwapiMirror:
+    """
+    SQLite-backed copy of the SWAPI collections.
+
+    Records are stored once per URL with the raw JSON payload, plus
+    indexed `name`/`created` columns for search and sort, and a `links`
+    table holding the foreign keys (homeworld, films, residents, ...).
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function(
+            "py_lower", 1, _py_lower, deterministic=True
+        )
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ----------------------------------------
+    # Import / incremental re-sync
+    # ----------------------------------------
+    def sync_resource(
+            self,
+            resource: str,
+            items: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Bring one collection in line with `items`.
+
+        Only records whose `edited` timestamp changed are rewritten;
+        records missing from `items` are removed.
+
+        Returns:
+            Dict[str, int]: counts of added, updated, deleted
+            and unchanged records.
+        """
+        items = [item for item in items if item.get("url")]
+        with self._lock, self._conn:
+            existing = {
+                row["url"]: row["edited"]
+                for row in self._conn.execute(
+                    "SELECT url, edited FROM records WHERE resource = ?",
+                    (resource,),
+                )
+            }
+            counts = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+            for item in items:
+                url = item["url"]
+                if url not in existing:
+                    counts["added"] += 1
+                elif existing[url] != item.get("edited"):
+                    counts["updated"] += 1
+                else:
+                    counts["unchanged"] += 1
+                    continue
+                self._upsert(resource, item)
+
+            stale = set(existing) - {item["url"] for item in items}
+            self._conn.executemany(
+                "DELETE FROM records WHERE url = ?",
+                [(url,) for url in stale],
+            )
+            counts["deleted"] = len(stale)
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state "
+                "(resource, synced_at, record_count) VALUES (?, ?, ?)",
+                (
+                    resource,
+                    datetime.now(timezone.utc).isoformat(),
+                    len(items),
+                ),
+            )
+        return counts
+
+    def _upsert(self, resource: str, item: Dict[str, Any]) -> None:
+        url = item["url"]
+        # Upsert in place so rowid (import order) is preserved.
+        self._conn.execute(
+            "INSERT INTO records "
+            "(url, resource, name, created, edited, data) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET "
+            "resource = excluded.resource, name = excluded.name, "
+            "created = excluded.created, edited = excluded.edited, "
+            "data = excluded.data",
+            (
+                url,
+                resource,
+                item.get("name"),
+                item.get("created"),
+                item.get("edited"),
+                json.dumps(item),
+            ),
+        )
+        self._conn.execute("DELETE FROM links WHERE src_url = ?", (url,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO links (src_url, field, dst_url) "
+            "VALUES (?, ?, ?)",
+            [
+                (url, field, dst_url)
+                for field in LINK_FIELDS
+                for dst_url in _as_list(item.get(field))
+            ],
+        )
+
+    def last_synced(self, resource: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT synced_at FROM sync_state WHERE resource = ?",
+            (resource,),
+        ).fetchone()
+        return row["synced_at"] if row else None
+
+    # ----------------------------------------
+    # Read path
+    # ----------------------------------------
+    def list_items(self, resource: str) -> List[Dict[str, Any]]:
+        """
+        Return every record of a collection, in import order.
+        """
+        rows = self._conn.execute(
+            "SELECT data FROM records WHERE resource = ? ORDER BY rowid",
+            (resource,),
+        )
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a single record by its canonical URL.
+        Trailing slashes are ignored.
+        """
+        row = self._conn.execute(
+            "SELECT data FROM records WHERE url IN (?, ?)",
+            (url.rstrip("/"), url.rstrip("/") + "/"),
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def query(
+            self,
+            resource: str,
+            search: Optional[str] = None,
+            sort_by: str = "name",
+            descending: bool = False,
+            offset: int = 0,
+            limit: int = 15) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Search, sort and paginate a collection inside SQLite.
+
+        Semantics match services.filter_items_by_name and
+        services.sort_items.
+
+        Returns:
+            Tuple[int, List[Dict[str, Any]]]: total matching count
+            and the requested page of records.
+
+        Raises:
+            ValueError: If sort_by is not a supported sort field.
+        """
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(
+                f"Invalid sort field: {sort_by}. "
+                f"Allowed fields are: {set(SORT_COLUMNS)}"
+            )
+
+        where = "resource = ?"
+        params: List[Any] = [resource]
+        if search:
+            where += " AND instr(py_lower(name), ?) > 0"
+            params.append(search.lower())
+
+        total = self._conn.execute(
+            f"SELECT COUNT(*) FROM records WHERE {where}", params
+        ).fetchone()[0]
+
+        direction = "DESC" if descending else "ASC"
+        rows = self._conn.execute(
+            f"SELECT data FROM records WHERE {where} "
+            f"ORDER BY {SORT_COLUMNS[sort_by]} {direction}, rowid "
+            "LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        )
+        return total, [json.loads(row["data"]) for row in rows]
+
+    def get_related(self, url: str, field: str) -> List[Dict[str, Any]]:
+        """
+        Follow a foreign key, e.g. get_related(planet_url, "residents")
+        or get_related(person_url, "homeworld").
+        """
+        rows = self._conn.execute(
+            "SELECT r.data FROM links l "
+            "JOIN records r ON r.url = l.dst_url "
+            "WHERE l.src_url = ? AND l.field = ? ORDER BY r.rowid",
+            (url, field),
+        )
+        return [json.loads(row["data"]) for row in rows]
+
+    def related_names(
+            self,
+            urls: Iterable[str],
+            field: str) -> Dict[str, str]:
+        """
+        Names of the records that `urls` point to through `field`, in a
+        single join, e.g. the homeworlds of one page of people.
+
+        Returns:
+            Dict[str, str]: target URL -> name.
+        """
+        urls = list(urls)
+        if not urls:
+            return {}
+        placeholders = ", ".join("?" * len(urls))
+        rows = self._conn.execute(
+            "SELECT DISTINCT l.dst_url, r.name FROM links l "
+            "JOIN records r ON r.url = l.dst_url "
+            f"WHERE l.field = ? AND l.src_url IN ({placeholders})",
+            [field, *urls],
+        )
+        return {row["dst_url"]: row["name"] for row in rows}
+
+
+def _as_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value] if value else []
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, str)]
+    return []
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Import or re-sync the mirror from SWAPI.
+
+    Usage: python -m app.mirror [resource ...]
+    """
+    import asyncio
+    from app import services
+
+    resources = argv or list(services.SWAPI_RESOURCES)
+    summary = asyncio.run(services.sync_mirror(resources))
+    for resource, counts in summary.items():
+        print(f"{resource}: {counts}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,198 @@
+# Opt-in request profiling: slow-request capture and /api/debug/profiles
+
+import heapq
+import io
+import itertools
+import os
+import random
+import secrets
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException
+
+# cProfile/pstats are imported by the middleware, which only exists
+# when profiling is enabled.
+
+# Configuration (read when the app is built, after load_dotenv()):
+# PROFILING_SAMPLE_RATE: fraction of requests profiled (0 disables).
+# PROFILING_HEADER: if "1", requests sending `X-Profile: 1` together with
+#   a valid `X-Debug-Token` are profiled as well.
+# PROFILING_TOKEN: required in `X-Debug-Token` to read /api/debug/profiles.
+# PROFILING_KEEP: how many of the slowest requests are retained.
+
+
+def _sample_rate() -> float:
+    return float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+
+
+def _header_enabled() -> bool:
+    return os.getenv("PROFILING_HEADER", "0") == "1"
+
+
+def _token() -> str:
+    return os.getenv("PROFILING_TOKEN", "")
+
+
+# Number of functions listed in each captured profile
+PROFILE_TOP_FUNCTIONS = 30
+
+# Long-lived SSE responses would hold the single profiling slot forever
+UNPROFILED_PATH_SUFFIXES = ("/stream",)
+
+
+def profiling_enabled() -> bool:
+    """
+    The middleware is only installed when this is true, so disabled
+    profiling adds nothing to the request path.
+    """
+    return _sample_rate() > 0 or _header_enabled()
+
+
+class ProfileStore:
+    """
+    Keeps the `size` slowest profiled requests.
+
+    A min-heap keyed on duration: the fastest retained entry sits at the
+    root and is the one evicted when a slower request arrives.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self._size = size
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._counter = itertools.count()
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = int(os.getenv("PROFILING_KEEP", "20"))
+        return self._size
+
+    def would_keep(self, duration: float) -> bool:
+        if self.size <= 0:
+            return False
+        return len(self._heap) < self.size or duration > self._heap[0][0]
+
+    def add(self, duration: float, entry: Dict[str, Any]) -> None:
+        if not self.would_keep(duration):
+            return
+        item = (duration, next(self._counter), entry)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        else:
+            heapq.heapreplace(self._heap, item)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs selected requests under cProfile.
+
+    cProfile records everything the event loop runs while the request is
+    in flight, so only one request is profiled at a time; requests that
+    overlap with it pass through unprofiled.
+    """
+
+    def __init__(
+            self,
+            app,
+            store: ProfileStore = profile_store,
+            sample_rate: Optional[float] = None,
+            header_enabled: Optional[bool] = None,
+            token: Optional[str] = None):
+        self.app = app
+        self.store = store
+        self.sample_rate = _sample_rate() if sample_rate is None \
+            else sample_rate
+        self.header_enabled = _header_enabled() if header_enabled is None \
+            else header_enabled
+        self.token = _token() if token is None else token
+        self._busy = False
+
+    def _should_profile(self, scope) -> bool:
+        if self._busy or scope["path"].endswith(UNPROFILED_PATH_SUFFIXES):
+            return False
+        if self.header_enabled and self.token:
+            headers = dict(scope.get("headers") or [])
+            if headers.get(b"x-profile") == b"1" and secrets.compare_digest(
+                    headers.get(b"x-debug-token", b""), self.token.encode()):
+                return True
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (debugger, coverage) already owns the hook
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._busy = False
+            duration = time.perf_counter() - start
+            # Rendering the stats is the expensive part; skip it for
+            # requests that would not make it into the store.
+            if self.store.would_keep(duration):
+                self.store.add(duration, {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode(),
+                    "status": status["code"],
+                    "duration_ms": round(duration * 1000, 3),
+                    "started_at": started_at.isoformat(),
+                    "profile": _render_stats(profiler),
+                })
+
+
+def _render_stats(profiler) -> str:
+    import pstats
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+router = APIRouter()
+
+
+@router.get("/debug/profiles")
+async def get_profiles(
+        x_debug_token: Optional[str] = Header(None)):
+    """
+    Slowest profiled requests, slowest first. Requires X-Debug-Token.
+    """
+    token = _token()
+    if not token or not x_debug_token or \
+            not secrets.compare_digest(x_debug_token, token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return {"profiles": profile_store.slowest()}
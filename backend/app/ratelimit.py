@@ -0,0 +1,334 @@
+# Inbound protection: per-client rate limiting and load shedding
+
+import asyncio
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, Optional, Tuple, Union
+
+from fastapi.responses import JSONResponse
+
+# Never limited or shed: orchestrator probes must always get an answer
+EXEMPT_PATH_PREFIXES = ("/api/health",)
+# Long-lived SSE responses are rate limited on connect but don't hold
+# a concurrency slot for their whole lifetime.
+UNSHED_PATH_SUFFIXES = ("/stream",)
+
+
+Networks = Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]
+
+
+def parse_networks(specs: Iterable[str]) -> Networks:
+    """
+    Parse addresses or CIDR ranges, e.g. "10.0.0.5" or "10.0.0.0/24".
+    """
+    return tuple(
+        ipaddress.ip_network(spec.strip(), strict=False)
+        for spec in specs if spec.strip()
+    )
+
+
+def _is_trusted(address: str, trusted_proxies: Networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_key(
+        scope,
+        api_keys: frozenset = frozenset(),
+        trusted_proxies: Networks = ()) -> str:
+    """
+    Identify the caller: a known X-API-Key, else the client address.
+
+    X-Forwarded-For is only read when the peer is a trusted proxy, since
+    anyone connecting directly controls it. The chain is then walked from
+    the right, skipping further trusted proxies; entries left of the
+    first untrusted address are client-supplied and ignored.
+    """
+    headers = dict(scope.get("headers") or [])
+    api_key = headers.get(b"x-api-key", b"").decode("latin-1")
+    if api_key and api_key in api_keys:
+        return f"key:{api_key}"
+
+    client = scope.get("client")
+    address = client[0] if client else "anonymous"
+    if not _is_trusted(address, trusted_proxies):
+        return address
+    forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+    for hop in reversed(forwarded.split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        address = hop
+        if not _is_trusted(hop, trusted_proxies):
+            break
+    return address
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets, one per client key.
+
+    Each bucket is a (tokens, last_refill) tuple refilled lazily on
+    access. Buckets live in an LRU-ordered dict capped at `max_clients`;
+    the least recently seen client is evicted first, which at worst
+    hands it a fresh (full) bucket.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: int,
+            max_clients: int = 10000,
+            clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def consume(self, key: str) -> Tuple[bool, float]:
+        """
+        Take one token for `key`.
+
+        Returns:
+            Tuple[bool, float]: whether the request is allowed and, if
+            not, the seconds until a token is available.
+        """
+        now = self._clock()
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = float(self.burst)
+        else:
+            tokens, last = bucket
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    async def allow(self, key: str) -> Tuple[bool, float]:
+        return self.consume(key)
+
+
+class CacheWindowLimiter:
+    """
+    Fixed-window counter kept in an aiocache backend, so several
+    processes sharing e.g. Redis enforce one limit together.
+
+    `burst` requests are allowed per window of burst / rate seconds.
+    """
+
+    def __init__(
+            self,
+            cache,
+            rate: float,
+            burst: int,
+            clock: Callable[[], float] = time.time):
+        self.cache = cache
+        self.limit = burst
+        self.window = burst / rate
+        self._clock = clock
+
+    async def allow(self, key: str) -> Tuple[bool, float]:
+        now = self._clock()
+        window_id = int(now // self.window)
+        cache_key = f"ratelimit:{key}:{window_id}"
+        count = await self.cache.increment(cache_key)
+        if count == 1:
+            await self.cache.expire(cache_key, math.ceil(self.window) + 1)
+        if count <= self.limit:
+            return True, 0.0
+        return False, (window_id + 1) * self.window - now
+
+
+class LoadShedder:
+    """
+    Caps in-flight requests at `max_concurrency`.
+
+    Requests beyond the cap wait in FIFO order; any that would wait
+    longer than `max_queue_wait` seconds are shed instead, so queueing
+    delay never grows past that bound.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            max_queue_wait: float,
+            retry_after: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self.retry_after = retry_after
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return True
+        if self.max_queue_wait <= 0:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot over by resolving the future
+            await asyncio.wait_for(waiter, self.max_queue_wait)
+            return True
+        except asyncio.TimeoutError:
+            # Since 3.12 wait_for raises even if release() handed us the
+            # slot in the same loop iteration; keep it rather than leak it.
+            return waiter.done() and not waiter.cancelled()
+        except asyncio.CancelledError:
+            # Cancelled right after being handed a slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying the per-client limiter (429) and the load
+    shedder (503), both with a Retry-After header.
+    """
+
+    def __init__(
+            self,
+            app,
+            limiter=None,
+            shedder: Optional[LoadShedder] = None,
+            api_keys: frozenset = frozenset(),
+            trusted_proxies: Networks = ()):
+        self.app = app
+        self.limiter = limiter
+        self.shedder = shedder
+        self.api_keys = api_keys
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or \
+                scope["path"].startswith(EXEMPT_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if self.limiter is not None:
+            allowed, retry_after = await self.limiter.allow(
+                client_key(scope, self.api_keys, self.trusted_proxies)
+            )
+            if not allowed:
+                await _reject(scope, receive, send, 429, retry_after,
+                              "Too many requests")
+                return
+
+        if self.shedder is None or \
+                scope["path"].endswith(UNSHED_PATH_SUFFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.shedder.acquire():
+            await _reject(scope, receive, send, 503,
+                          self.shedder.retry_after, "Server busy")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.release()
+
+
+async def _reject(scope, receive, send, status_code, retry_after, detail):
+    response = JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+    await response(scope, receive, send)
+
+
+def rate_limit_enabled() -> bool:
+    return os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+
+
+def trusted_proxies_from_env() -> Networks:
+    return parse_networks(
+        os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",")
+    )
+
+
+def middleware_options_from_env(cache) -> dict:
+    """
+    Build RateLimitMiddleware options from the environment:
+
+    RATE_LIMIT_TRUSTED_PROXIES: comma-separated proxy addresses/CIDRs
+        whose X-Forwarded-For is honoured (default none). Per-client
+        limiting is only on once this is set: behind a proxy, clients
+        would otherwise share the proxy's few buckets.
+    RATE_LIMIT_PER_CLIENT: "1" or "0" to force per-client limiting on
+        (e.g. clients connect directly) or off.
+    RATE_LIMIT_PER_SECOND / RATE_LIMIT_BURST: sustained rate and burst
+        per client (default 10/s, bursts of 40).
+    RATE_LIMIT_BACKEND: "memory" (default, per process) or "cache"
+        (shared through the aiocache backend).
+    RATE_LIMIT_MAX_CLIENTS: buckets kept in memory (default 10000).
+    RATE_LIMIT_API_KEYS: comma-separated keys limited per key, not per IP.
+    MAX_CONCURRENT_REQUESTS / MAX_QUEUE_WAIT_SECONDS: load shedding
+        (default 64 in flight, shed after waiting 0.5s).
+    """
+    trusted_proxies = trusted_proxies_from_env()
+    rate = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+    burst = int(os.getenv("RATE_LIMIT_BURST", "40"))
+    per_client = os.getenv("RATE_LIMIT_PER_CLIENT")
+    if per_client is None and not trusted_proxies:
+        print("Per-client rate limiting is off: set "
+              "RATE_LIMIT_TRUSTED_PROXIES to the proxy / load balancer "
+              "addresses, or RATE_LIMIT_PER_CLIENT=1 if clients connect "
+              "directly")
+        limiter = None
+    elif per_client is not None and per_client != "1":
+        limiter = None
+    elif os.getenv("RATE_LIMIT_BACKEND", "memory") == "cache":
+        limiter = CacheWindowLimiter(cache, rate, burst)
+    else:
+        limiter = TokenBucketLimiter(
+            rate, burst,
+            max_clients=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000")),
+        )
+    api_keys = frozenset(
+        key for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key
+    )
+    shedder = LoadShedder(
+        max_concurrency=int(os.getenv("MAX_CONCURRENT_REQUESTS", "64")),
+        max_queue_wait=float(os.getenv("MAX_QUEUE_WAIT_SECONDS", "0.5")),
+    )
+    return {
+        "limiter": limiter,
+        "shedder": shedder,
+        "api_keys": api_keys,
+        "trusted_proxies": trusted_proxies,
+    }
@@ -206,3 +206,16 @@ class PaginatedResponse(BaseModel, Generic[T]):
     results: List[T] = Field(
         ...,
         description="List of results for the current page")
+
+
+# ----------------------------------------
+# Typeahead response for /{resource}/suggest
+# ----------------------------------------
+class Suggestions(BaseModel):
+    """
+    Names matching a typeahead query, best matches first.
+    """
+    query: str = Field(..., description="The query as received")
+    suggestions: List[str] = Field(
+        default_factory=list,
+        description="Matching names, prefix matches first")
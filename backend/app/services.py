@@ -1,15 +1,42 @@
 # For business logic and external API calls
 
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime
 import os
-from typing import Any, Dict, List, Optional
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from aiocache import Cache
 from aiolimiter import AsyncLimiter
-import httpx
+
+from app.circuit import CircuitBreaker, CircuitOpenError
+from app.insights import create_insight_service
+from app.stats import compute_rollups
+from app.stream import change_feed, diff_records
+from app.suggest import SuggestIndex
+
+# httpx and the SQLite mirror are imported on first use: only one of the
+# two data sources is needed, and neither is needed to pass health checks.
+if TYPE_CHECKING:
+    from app.mirror import SwapiMirror
 
 # Base URL for SWAPI, can be overridden by environment variable
 BASE_SWAPI_URL = os.getenv("SWAPI_BASE_URL", "https://swapi.info/api")
 ALLOWED_SORT_FIELDS = {"name", "created"}
+SWAPI_RESOURCES = (
+    "people", "planets", "films", "species", "vehicles", "starships"
+)
+
+# Data source: "http" (live SWAPI) or "mirror" (local SQLite copy).
+# Import the mirror once with `python -m app.mirror`.
+SWAPI_DATA_SOURCE = os.getenv("SWAPI_DATA_SOURCE", "http")
+SWAPI_MIRROR_PATH = os.getenv("SWAPI_MIRROR_PATH", "swapi_mirror.sqlite3")
+
+# Collections that must be loaded before the API reports ready;
+# they are warmed up in the background at startup.
+READINESS_RESOURCES = tuple(
+    os.getenv("READINESS_RESOURCES", "people,planets").split(",")
+)
 
 # Initialize cache and rate limiter
 # Use aiocache with memory backend for local development
@@ -17,37 +44,354 @@ ALLOWED_SORT_FIELDS = {"name", "created"}
 cache = Cache(Cache.MEMORY)  # Use Redis in production
 rate_limiter = AsyncLimiter(max_rate=5, time_period=1.0)  # 5 requests/second
 
+# Stop calling SWAPI for 30s after 5 consecutive failures
+upstream_circuit = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+
+# Collection cache hits/misses, reported by /api/health/ready
+cache_stats = {"hits": 0, "misses": 0}
+
+# In-flight collection loads; concurrent misses share one load
+_refreshes: Dict[str, asyncio.Future] = {}
+
+# AI insights share the response cache (keys are prefixed "insight:")
+insight_service = create_insight_service(cache)
+
+_mirror: Optional["SwapiMirror"] = None
+
+# Mirror sync time behind each cached collection (mirror data source only)
+_mirror_synced_at: Dict[str, Optional[str]] = {}
+
+
+def use_mirror() -> bool:
+    return SWAPI_DATA_SOURCE == "mirror"
+
+
+def get_mirror() -> "SwapiMirror":
+    # Opened lazily so the HTTP data source never touches SQLite.
+    global _mirror
+    if _mirror is None:
+        from app.mirror import SwapiMirror
+        if not os.path.exists(SWAPI_MIRROR_PATH):
+            # SQLite would quietly create an empty database
+            print(f"SWAPI mirror {SWAPI_MIRROR_PATH} not found; "
+                  "run `python -m app.mirror` to import it")
+        _mirror = SwapiMirror(SWAPI_MIRROR_PATH)
+    return _mirror
+
+
+def _mirror_resynced(resource: str) -> bool:
+    # `python -m app.mirror` runs in its own process, so its cache.delete()
+    # never reaches this one; compare the mirror's sync time instead.
+    if not use_mirror():
+        return False
+    synced_at = get_mirror().last_synced(resource)
+    return synced_at != _mirror_synced_at.get(resource)
+
+
+@dataclass
+class Snapshot:
+    """
+    One loaded version of a collection.
+    A new snapshot is published every time a (re)load changes the
+    dataset, together with the lookup structures derived from it.
+    """
+    resource: str
+    version: int
+    items: List[Dict[str, Any]]
+    built_at: float
+    suggest_index: SuggestIndex
+    rollups: Dict[str, Any]
+
+
+snapshots: Dict[str, Snapshot] = {}
+
+
+def publish_snapshot(
+        resource: str,
+        items: List[Dict[str, Any]]) -> Snapshot:
+    """
+    Store a new snapshot and push its diff against the previous one
+    to /api/stream subscribers. Unchanged data keeps the current one.
+    """
+    previous = snapshots.get(resource)
+    diff = diff_records(previous.items if previous else [], items)
+    if previous is not None and not diff["changed"] and not diff["removed"]:
+        # Nothing changed: keep the version (and the derived indexes) so
+        # versions reported on /stream only move with an event.
+        previous.items = items
+        return previous
+
+    snapshot = Snapshot(
+        resource=resource,
+        version=previous.version + 1 if previous else 1,
+        items=items,
+        built_at=time.time(),
+        # Films are titled rather than named
+        suggest_index=SuggestIndex(
+            item.get("name") or item.get("title") for item in items
+        ),
+        rollups=compute_rollups(resource, items),
+    )
+    snapshots[resource] = snapshot
+    change_feed.publish({
+        "type": "snapshot",
+        "resource": resource,
+        "version": snapshot.version,
+        **diff,
+    })
+    return snapshot
+
+
+async def get_snapshot(resource: str) -> Snapshot:
+    """
+    Current snapshot of a collection, loading it if needed.
+    """
+    items = await fetch_all_swapi_resource(resource)
+    snapshot = snapshots.get(resource)
+    # A shared cache backend returns a fresh copy on every read, so
+    # fall back to comparing contents before treating it as new data.
+    if snapshot is None or (
+            snapshot.items is not items and snapshot.items != items):
+        snapshot = publish_snapshot(resource, items)
+    return snapshot
+
 
 async def fetch_all_swapi_resource(resource: str) -> List[Dict[str, Any]]:
     url = f"{BASE_SWAPI_URL}/{resource}"
 
     # Try cache first
     cached = await cache.get(url)
-    if cached:
+    if cached and not _mirror_resynced(resource):
+        cache_stats["hits"] += 1
         return cached
+    cache_stats["misses"] += 1
+
+    refresh = _start_refresh(resource)
+    snapshot = snapshots.get(resource)
+    if snapshot is not None and not use_mirror():
+        # Expired: serve the last snapshot while SWAPI is reloaded in
+        # the background, rather than waiting on (or failing with) it.
+        # Mirror reloads are local and fast, so they stay inline.
+        return snapshot.items
+
+    # shield: a cancelled caller must not abort the shared load
+    return await asyncio.shield(refresh)
+
+
+def _start_refresh(resource: str) -> asyncio.Future:
+    """
+    The in-flight load of a collection, starting one if there is none.
+    """
+    refresh = _refreshes.get(resource)
+    if refresh is None:
+        url = f"{BASE_SWAPI_URL}/{resource}"
+        refresh = asyncio.ensure_future(_load_collection(resource, url))
+        _refreshes[resource] = refresh
+
+        def done(future, resource=resource):
+            if _refreshes.get(resource) is future:
+                del _refreshes[resource]
+            # Background refreshes have no caller to report failures to
+            if not future.cancelled() and future.exception() is not None:
+                print(f"Refresh of {resource} failed: {future.exception()}")
+        refresh.add_done_callback(done)
+    return refresh
+
+
+def pending_refreshes() -> List[str]:
+    return sorted(_refreshes)
+
+
+async def _load_collection(
+        resource: str,
+        url: str) -> List[Dict[str, Any]]:
+    if use_mirror():
+        mirror = get_mirror()
+        # Read the sync time first: a sync landing in between only
+        # causes one extra reload.
+        _mirror_synced_at[resource] = mirror.last_synced(resource)
+        results = mirror.list_items(resource)
+    else:
+        results = await _fetch_upstream_collection(url)
+
+    # Cache for 1 week (7 days * 24h * 3600s)
+    await cache.set(url, results, ttl=604800)
+    publish_snapshot(resource, results)
+    return results
+
 
+async def _fetch_upstream_collection(url: str) -> List[Dict[str, Any]]:
+    import httpx
+
+    upstream_circuit.before_call()
     # Wait here if we've reached the rate limit (5 requests/sec).
     # Helps prevent being blocked by SWAPI or causing server overload.
     async with rate_limiter:
         async with httpx.AsyncClient() as client:
-            response = await client.get(url)
+            try:
+                response = await client.get(url)
+            except httpx.TransportError:
+                upstream_circuit.record_failure()
+                raise
+            _record_upstream_status(response.status_code)
             response.raise_for_status()
             data = response.json()
             if isinstance(data, list):
-                results = data
-            else:
-                results = data.get("results", [])
+                return data
+            return data.get("results", [])
+
+
+def _record_upstream_status(status_code: int) -> None:
+    # Only server errors say SWAPI is unhealthy; a 404 is a valid answer.
+    if status_code >= 500:
+        upstream_circuit.record_failure()
+    else:
+        upstream_circuit.record_success()
+
+
+async def warm_up(resources=READINESS_RESOURCES, retry_delay: float = 5.0):
+    """
+    Load collections in the background until all of them are cached,
+    so the first user request doesn't wait on SWAPI.
+    """
+    remaining = list(resources)
+    while remaining:
+        for resource in list(remaining):
+            try:
+                await get_snapshot(resource)
+                remaining.remove(resource)
+            except Exception as e:
+                print(f"Warm-up of {resource} failed: {e}")
+        if remaining:
+            await asyncio.sleep(retry_delay)
+
+
+async def readiness() -> Dict[str, Any]:
+    """
+    Readiness report built from local state only; never calls SWAPI.
+
+    A collection is warm once it has a snapshot. An expired cache entry
+    doesn't make it cold: reads keep serving the snapshot and reload
+    it in the background (see fetch_all_swapi_resource).
+    """
+    now = time.time()
+    resources = {}
+    for resource in READINESS_RESOURCES:
+        snapshot = snapshots.get(resource)
+        # An empty (never imported) mirror must not pass as warm
+        if snapshot is None or (
+                use_mirror() and get_mirror().last_synced(resource) is None):
+            resources[resource] = {"state": "cold"}
+            continue
+        cached = await cache.exists(f"{BASE_SWAPI_URL}/{resource}")
+        resources[resource] = {
+            "state": "warm",
+            "version": snapshot.version,
+            "records": len(snapshot.items),
+            "age_seconds": round(now - snapshot.built_at, 1),
+            "cached": cached,
+        }
+
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    return {
+        "status": "ready" if all(
+            r["state"] == "warm" for r in resources.values()
+        ) else "not_ready",
+        "resources": resources,
+        "cache": {
+            **cache_stats,
+            "hit_ratio": round(cache_stats["hits"] / lookups, 3)
+            if lookups else None,
+        },
+        "upstream": {
+            "data_source": SWAPI_DATA_SOURCE,
+            "circuit": upstream_circuit.state,
+            "consecutive_failures": upstream_circuit.consecutive_failures,
+        },
+        "pending_refreshes": pending_refreshes(),
+    }
 
-            # Cache for 1 week (7 days * 24h * 3600s)
-            await cache.set(url, results, ttl=604800)
-            return results
+
+async def sync_mirror(
+        resources=SWAPI_RESOURCES) -> Dict[str, Dict[str, int]]:
+    """
+    Import (or incrementally re-sync) SWAPI collections into the mirror.
+    Always reads from the live upstream, whatever the data source.
+
+    Returns:
+        Dict[str, Dict[str, int]]: per-resource added/updated/
+        deleted/unchanged counts.
+    """
+    mirror = get_mirror()
+    summary = {}
+    for resource in resources:
+        url = f"{BASE_SWAPI_URL}/{resource}"
+        items = await _fetch_upstream_collection(url)
+        summary[resource] = mirror.sync_resource(resource, items)
+        # Drop the cached copy so the next read sees the new rows.
+        await cache.delete(url)
+    return summary
+
+
+async def find_record_by_name(
+        name: str,
+        resources=("people", "planets")) -> Optional[Dict[str, Any]]:
+    """
+    First record with an exact name match across the given collections.
+    """
+    for resource in resources:
+        for item in await fetch_all_swapi_resource(resource):
+            if item.get("name") == name:
+                return item
+    return None
+
+
+async def fetch_homeworld_names(
+        people: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Homeworld URL -> planet name for a page of people.
+    """
+    if use_mirror():
+        # One join over the mirror's links table
+        return get_mirror().related_names(
+            (person["url"] for person in people if person.get("url")),
+            "homeworld",
+        )
+
+    # Extract unique homeworld URLs
+    # This avoids fetching the same homeworld multiple times
+    unique_homeworlds = list({
+        person.get("homeworld") for person in people
+        if person.get("homeworld")
+    })
+
+    # Fetch each homeworld in parallel using fetch by URL service
+    results = await asyncio.gather(*[
+        fetch_swapi_resource_by_url(url) for url in unique_homeworlds
+    ])
+    return {
+        url: result.get("name")
+        for url, result in zip(unique_homeworlds, results) if result
+    }
 
 
 async def fetch_swapi_resource_by_url(url: str) -> Optional[Dict[str, Any]]:
+    if use_mirror():
+        return get_mirror().get_by_url(url)
+
+    import httpx
+
+    try:
+        upstream_circuit.before_call()
+    except CircuitOpenError as e:
+        print(f"Skipping {url}: {e}")
+        return None
+
     # Fetch a single resource by URL
     async with httpx.AsyncClient() as client:
         try:
             response = await client.get(url, follow_redirects=True)
+            _record_upstream_status(response.status_code)
             response.raise_for_status()
             json_data = response.json()
             print(f"Fetched {url}: {json_data.get('name', 'No name found')}")
@@ -55,6 +399,10 @@ async def fetch_swapi_resource_by_url(url: str) -> Optional[Dict[str, Any]]:
         except httpx.HTTPStatusError as e:
             print(f"HTTP error fetching {url}: {e}")
             return None
+        except httpx.TransportError as e:
+            upstream_circuit.record_failure()
+            print(f"Transport error fetching {url}: {e}")
+            return None
         except Exception as e:
             print(f"Unexpected error fetching {url}: {e}")
             return None
@@ -68,29 +416,45 @@ async def get_filtered_sorted_paginated_items(
         sort_by: str = "name",
         descending: bool = False,
 ) -> Dict[str, Any]:
-    # Fetch entire dataset
-    all_items = await fetch_all_swapi_resource(resource)
+    start = (page - 1) * per_page
 
-    # Filter by search term if present
-    filtered_items = filter_items_by_name(all_items, search)
+    # Mirror mode: search, sort and paginate inside SQLite.
+    if use_mirror():
+        # This path skips the collection cache, so notice a re-sync from
+        # another process here and republish the snapshot for /stream.
+        if resource in snapshots and _mirror_resynced(resource):
+            await get_snapshot(resource)
+        total_count, paginated_items = get_mirror().query(
+            resource,
+            search=search,
+            sort_by=sort_by,
+            descending=descending,
+            offset=start,
+            limit=per_page,
+        )
+    else:
+        # Fetch entire dataset
+        all_items = await fetch_all_swapi_resource(resource)
 
-    # Sort filtered items
-    # Will raise ValueError if sort_by not allowed.
-    sorted_items = sort_items(filtered_items, sort_by, descending)
+        # Filter by search term if present
+        filtered_items = filter_items_by_name(all_items, search)
 
-    # Paginate locally
-    # total_count: total number of items after filtering.
-    # start: starting index in the sorted list.
-    total_count = len(sorted_items)
-    start = (page - 1) * per_page
+        # Sort filtered items
+        # Will raise ValueError if sort_by not allowed.
+        sorted_items = sort_items(filtered_items, sort_by, descending)
 
-    # handle the case where page requested is beyond available pages gracefully
-    # If start index exceeds total items, return empty results.
-    # Otherwise, slice the list for current page.
-    if start >= total_count:
-        paginated_items = []
-    else:
-        paginated_items = sorted_items[start:start + per_page]
+        # Paginate locally
+        # total_count: total number of items after filtering.
+        # start: starting index in the sorted list.
+        total_count = len(sorted_items)
+
+        # handle the case where page requested is beyond available pages gracefully
+        # If start index exceeds total items, return empty results.
+        # Otherwise, slice the list for current page.
+        if start >= total_count:
+            paginated_items = []
+        else:
+            paginated_items = sorted_items[start:start + per_page]
 
     # Helper function to build URL for given page.
     # Includes query params: page, search, sort_by, order.
@@ -0,0 +1,155 @@
+# Precomputed aggregates for /api/stats/{resource}
+
+import math
+from typing import Any, Dict, List, Optional, Union
+
+Number = Union[int, float]
+
+# SWAPI numeric fields per collection (SWAPI serves them as strings)
+NUMERIC_FIELDS = {
+    "people": ("height", "mass"),
+    "planets": (
+        "rotation_period", "orbital_period", "diameter",
+        "surface_water", "population",
+    ),
+    "films": ("episode_id",),
+    "species": ("average_height", "average_lifespan"),
+    "starships": (
+        "cost_in_credits", "length", "max_atmosphering_speed",
+        "crew", "passengers", "cargo_capacity", "hyperdrive_rating", "MGLT",
+    ),
+    "vehicles": (
+        "cost_in_credits", "length", "max_atmosphering_speed",
+        "crew", "passengers", "cargo_capacity",
+    ),
+}
+
+# Fields records can be grouped by. Lists (films) and comma-separated
+# strings (climate "arid, temperate") put a record in several groups,
+# so e.g. grouping people by `films` gives people per film.
+GROUP_FIELDS = {
+    "people": (
+        "gender", "eye_color", "hair_color", "skin_color",
+        "homeworld", "films", "species",
+    ),
+    "planets": ("climate", "terrain", "films"),
+    "films": ("director", "producer"),
+    "species": ("classification", "designation", "language", "homeworld"),
+    "starships": ("starship_class", "manufacturer", "films"),
+    "vehicles": ("vehicle_class", "manufacturer", "films"),
+}
+
+
+def parse_number(value: Any) -> Optional[Number]:
+    """
+    Normalize a SWAPI numeric string: "1,358" -> 1358, "1.0" -> 1,
+    "unknown"/"n/a"/"30-165" -> None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = value
+    elif isinstance(value, str):
+        try:
+            number = float(value.replace(",", ""))
+        except ValueError:
+            return None
+    else:
+        return None
+    if not math.isfinite(number):
+        return None
+    return int(number) if float(number).is_integer() else number
+
+
+def group_keys(value: Any) -> List[str]:
+    # dict.fromkeys drops duplicates while keeping order
+    if isinstance(value, list):
+        keys = [v for v in value if isinstance(v, str) and v]
+    elif isinstance(value, str):
+        keys = [part.strip() for part in value.split(",") if part.strip()]
+    else:
+        keys = []
+    return list(dict.fromkeys(keys))
+
+
+class _Summary:
+    __slots__ = ("count", "sum", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.sum: Number = 0
+        self.min: Optional[Number] = None
+        self.max: Optional[Number] = None
+
+    def add(self, number: Number) -> None:
+        self.count += 1
+        self.sum += number
+        self.min = number if self.min is None else min(self.min, number)
+        self.max = number if self.max is None else max(self.max, number)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+def compute_rollups(
+        resource: str,
+        items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate a collection in one pass.
+
+    Returns:
+        Dict[str, Any]: `count`, `fields` (count/sum/min/max of known
+        values per numeric field) and `groups` (per group-by field, the
+        same figures for every group value).
+    """
+    numeric = NUMERIC_FIELDS.get(resource, ())
+    group_fields = GROUP_FIELDS.get(resource, ())
+
+    totals = {field: _Summary() for field in numeric}
+    groups: Dict[str, Dict[str, Dict[str, Any]]] = {
+        field: {} for field in group_fields
+    }
+
+    for item in items:
+        numbers = {field: parse_number(item.get(field)) for field in numeric}
+        for field, number in numbers.items():
+            if number is not None:
+                totals[field].add(number)
+
+        for group_field in group_fields:
+            for key in group_keys(item.get(group_field)):
+                group = groups[group_field].get(key)
+                if group is None:
+                    group = groups[group_field][key] = {
+                        "count": 0,
+                        "fields": {field: _Summary() for field in numeric},
+                    }
+                group["count"] += 1
+                for field, number in numbers.items():
+                    if number is not None:
+                        group["fields"][field].add(number)
+
+    return {
+        "count": len(items),
+        "fields": {
+            field: summary.as_dict() for field, summary in totals.items()
+        },
+        "groups": {
+            group_field: {
+                key: {
+                    "count": group["count"],
+                    "fields": {
+                        field: summary.as_dict()
+                        for field, summary in group["fields"].items()
+                    },
+                }
+                for key, group in values.items()
+            }
+            for group_field, values in groups.items()
+        },
+    }
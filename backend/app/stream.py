@@ -0,0 +1,135 @@
+# Change feed: snapshot diffs and fan-out to /api/stream subscribers
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+Event = Dict[str, Any]
+
+
+def diff_records(
+        previous: List[Dict[str, Any]],
+        current: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Compare two snapshots of a collection record by record.
+
+    Records are matched by `url`; a record counts as changed when it is
+    new or its `edited` timestamp differs.
+
+    Returns:
+        Dict[str, List[Any]]: `changed` (full records) and
+        `removed` (URLs).
+    """
+    previous_edited = {
+        item.get("url"): item.get("edited") for item in previous
+    }
+    current_urls = set()
+    changed = []
+    for item in current:
+        url = item.get("url")
+        current_urls.add(url)
+        if url not in previous_edited or \
+                previous_edited[url] != item.get("edited"):
+            changed.append(item)
+    removed = [url for url in previous_edited if url not in current_urls]
+    return {"changed": changed, "removed": removed}
+
+
+class Broadcaster:
+    """
+    Single shared event log with cursor-based subscribers.
+
+    Published events are appended to a bounded log. Subscribers only
+    keep the sequence number of the last event they saw and all wait on
+    one shared future, so an idle connection costs a cursor and a
+    callback rather than a queue of its own.
+
+    Sequence numbers only mean something within one log, so event ids
+    handed to clients carry the log's random `epoch` as well.
+    """
+
+    def __init__(self, history: Optional[int] = 256):
+        # history=None keeps every event (used for finite streams)
+        self._events: Deque[Tuple[int, Event]] = deque(maxlen=history)
+        self._seq = 0
+        self._waiter: Optional[asyncio.Future] = None
+        self.epoch = uuid.uuid4().hex[:12]
+
+    @property
+    def cursor(self) -> int:
+        """Sequence number of the latest published event."""
+        return self._seq
+
+    def event_id(self, seq: int) -> str:
+        """SSE id for `seq`, e.g. "3f2a9c1e0b7d:42"."""
+        return f"{self.epoch}:{seq}"
+
+    def resume_cursor(self, event_id: str) -> Optional[int]:
+        """
+        Cursor for a Last-Event-ID issued by this log, or None if it
+        came from another log (a previous process or another task).
+        """
+        epoch, _, seq = event_id.partition(":")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def publish(self, event: Event) -> int:
+        self._seq += 1
+        self._events.append((self._seq, event))
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return self._seq
+
+    def events_after(self, cursor: int) -> List[Tuple[int, Event]]:
+        """
+        Events newer than `cursor`. If the subscriber fell further
+        behind than the log keeps, or holds a cursor from before a
+        restart (ahead of this log), a single `resync` event is returned.
+        """
+        if cursor > self._seq:
+            return [(self._seq, {"type": "resync"})]
+        if cursor == self._seq:
+            return []
+        oldest = self._events[0][0] if self._events else self._seq + 1
+        if cursor < oldest - 1:
+            return [(self._seq, {"type": "resync"})]
+        return list(self._events)[cursor - oldest + 1:]
+
+    async def wait(
+            self,
+            cursor: int,
+            timeout: float) -> List[Tuple[int, Event]]:
+        """
+        Wait up to `timeout` seconds for events newer than `cursor`.
+        Returns an empty list on timeout.
+        """
+        events = self.events_after(cursor)
+        if events:
+            return events
+
+        loop = asyncio.get_running_loop()
+        if self._waiter is None or self._waiter.get_loop() is not loop:
+            self._waiter = loop.create_future()
+        try:
+            # shield: a timed-out subscriber must not cancel the
+            # future every other subscriber is waiting on.
+            await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.events_after(cursor)
+
+
+def format_sse(event_id: Union[int, str], event: Event) -> str:
+    """
+    Encode an event in text/event-stream format.
+    """
+    data = json.dumps(event, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event.get('type', 'message')}\ndata: {data}\n\n"
+
+
+# Process-wide feed, published to by services when a snapshot changes
+change_feed = Broadcaster()
@@ -0,0 +1,108 @@
+# Typeahead index for /api/{resource}/suggest
+
+from bisect import bisect_left
+from typing import Iterable, List, Tuple
+
+# Minimum similarity (0-1) for a fuzzy match, e.g. "skywaker" ~ "skywalker"
+FUZZY_CUTOFF = 0.75
+
+
+class SuggestIndex:
+    """
+    Prefix index over the names of one collection.
+
+    Built once per snapshot. Lookups are ranked:
+    1. names starting with the query,
+    2. names with a word starting with the query,
+    3. names containing the query anywhere,
+    4. (optional) names with a word close to the query; for a query
+       of several words, names with a word close to each of them.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        unique = sorted({name for name in names if name}, key=str.lower)
+        self._names: List[Tuple[str, str]] = [
+            (name.lower(), name) for name in unique
+        ]
+        self._words: List[Tuple[str, str]] = sorted(
+            (word, name)
+            for lowered, name in self._names
+            for word in lowered.split()
+        )
+        self._word_list = sorted({word for word, _ in self._words})
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _prefix_range(
+            entries: List[Tuple[str, str]],
+            prefix: str) -> List[str]:
+        start = bisect_left(entries, (prefix,))
+        matches = []
+        for key, name in entries[start:]:
+            if not key.startswith(prefix):
+                break
+            matches.append(name)
+        return matches
+
+    def suggest(
+            self,
+            query: str,
+            limit: int = 10,
+            fuzzy: bool = False) -> List[str]:
+        """
+        Up to `limit` names matching `query`, best matches first.
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        results: List[str] = []
+        seen = set()
+
+        def take(names: Iterable[str]) -> bool:
+            # Returns True once `limit` results have been collected
+            for name in names:
+                if name not in seen:
+                    seen.add(name)
+                    results.append(name)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        if take(self._prefix_range(self._names, query)):
+            return results
+        if take(self._prefix_range(self._words, query)):
+            return results
+        if take(name for key, name in self._names if query in key):
+            return results
+        if fuzzy:
+            # Earlier words are complete and must each match some word of
+            # the name; the last may still be being typed, so it also
+            # matches as a prefix, and ranks the results.
+            *leading, last = query.split()
+            required = [
+                set(self._close_word_names(word, len(self._word_list)))
+                for word in leading
+            ]
+            candidates = self._prefix_range(self._words, last) if leading \
+                else []
+            candidates += self._close_word_names(last, limit)
+            take(
+                name for name in candidates
+                if all(name in names for names in required)
+            )
+        return results
+
+    def _close_word_names(self, word: str, n: int) -> List[str]:
+        # Names with a word close to `word`, closest words first
+        import difflib
+
+        close = difflib.get_close_matches(
+            word, self._word_list, n=n, cutoff=FUZZY_CUTOFF
+        )
+        return [
+            name for match in close
+            for name in self._prefix_range(self._words, match)
+        ]
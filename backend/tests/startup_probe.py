@@ -0,0 +1,68 @@
+"""
+Cold start probe for the backend.
+
+Run in a fresh interpreter (python tests/startup_probe.py) and prints JSON:
+- import_ms: time to import app.main
+- first_healthy_ms: process start of the import until /api/health
+  has answered 200, served in-process through the ASGI interface
+- optional_modules: lazily imported modules that got loaded anyway
+"""
+
+import time
+
+start = time.perf_counter()
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app  # noqa: E402
+
+imported = time.perf_counter()
+
+# Only needed by a data source, a debug feature or fuzzy search
+OPTIONAL_MODULES = (
+    "httpx", "sqlite3", "app.mirror", "cProfile", "pstats", "difflib",
+)
+
+
+async def get_status(path: str) -> int:
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app({
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"probe")],
+        "client": ("127.0.0.1", 0),
+        "server": ("probe", 80),
+    }, receive, send)
+    return status["code"]
+
+
+health_status = asyncio.run(get_status("/api/health"))
+healthy = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": round((imported - start) * 1000, 1),
+    "first_healthy_ms": round((healthy - start) * 1000, 1),
+    "health_status": health_status,
+    "docs_status": asyncio.run(get_status("/docs")),
+    "optional_modules": [m for m in OPTIONAL_MODULES if m in sys.modules],
+}))
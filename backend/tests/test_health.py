@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+import respx
+from httpx import AsyncClient, ASGITransport, Response
+
+import app.services as services
+from app.circuit import CircuitBreaker, CircuitOpenError
+from app.main import app
+
+BASE_SWAPI_URL = services.BASE_SWAPI_URL
+
+
+@pytest_asyncio.fixture
+async def fresh_state(monkeypatch):
+    monkeypatch.setattr(services, "snapshots", {})
+    monkeypatch.setattr(services, "cache_stats", {"hits": 0, "misses": 0})
+    monkeypatch.setattr(services, "upstream_circuit", CircuitBreaker())
+    await services.cache.clear()
+    yield
+    await services.cache.clear()
+
+
+async def _get(path):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await ac.get(path)
+
+
+@pytest.mark.asyncio
+async def test_liveness():
+    for path in ("/api/health", "/api/health/live"):
+        response = await _get(path)
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_readiness_cold_does_not_call_upstream(fresh_state):
+    """
+    A cold process reports 503 per resource without touching SWAPI.
+    """
+    upstream = respx.get(url__startswith=BASE_SWAPI_URL)
+
+    response = await _get("/api/health/ready")
+
+    assert response.status_code == 503
+    data = response.json()
+    assert data["status"] == "not_ready"
+    assert data["resources"]["people"] == {"state": "cold"}
+    assert data["upstream"]["circuit"] == "closed"
+    assert data["cache"]["hit_ratio"] is None
+    assert data["pending_refreshes"] == []
+    assert upstream.call_count == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_readiness_warm_after_load(fresh_state):
+    """
+    Once the readiness collections are loaded the probe reports 200.
+    """
+    for resource in services.READINESS_RESOURCES:
+        respx.get(f"{BASE_SWAPI_URL}/{resource}").mock(return_value=Response(
+            200, json=[{"name": "X", "url": f"{BASE_SWAPI_URL}/{resource}/1"}]
+        ))
+    await services.warm_up()
+    await services.fetch_all_swapi_resource("people")
+
+    response = await _get("/api/health/ready")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["resources"]["people"]["state"] == "warm"
+    assert data["resources"]["people"]["version"] == 1
+    assert data["resources"]["people"]["records"] == 1
+    assert data["cache"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_readiness_survives_cache_expiry(fresh_state):
+    """
+    After the collection cache expires the task stays ready without the
+    probe calling SWAPI; the next read serves the last snapshot at once
+    and reloads it in the background.
+    """
+    routes = {
+        resource: respx.get(f"{BASE_SWAPI_URL}/{resource}").mock(
+            return_value=Response(200, json=[
+                {"name": "X", "url": f"{BASE_SWAPI_URL}/{resource}/1"}
+            ])
+        )
+        for resource in services.READINESS_RESOURCES
+    }
+    await services.warm_up()
+    await services.cache.clear()  # same as every entry reaching its TTL
+
+    response = await _get("/api/health/ready")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["resources"]["people"]["cached"] is False
+    assert data["pending_refreshes"] == []
+    assert all(route.call_count == 1 for route in routes.values())
+
+    stale = await services.fetch_all_swapi_resource("people")
+    assert stale is services.snapshots["people"].items
+    assert services.pending_refreshes() == ["people"]
+
+    await asyncio.gather(*services._refreshes.values())
+    assert routes["people"].call_count == 2
+    data = (await _get("/api/health/ready")).json()
+    assert data["resources"]["people"]["cached"] is True
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stale_snapshot_served_while_swapi_is_down(fresh_state):
+    """
+    Once loaded, an expired collection keeps being served when the
+    background reload fails.
+    """
+    url = f"{BASE_SWAPI_URL}/people"
+    route = respx.get(url).mock(return_value=Response(
+        200, json=[{"name": "Luke Skywalker", "url": f"{url}/1"}]
+    ))
+    await services.get_snapshot("people")
+    await services.cache.clear()
+    route.mock(return_value=Response(503))
+
+    for _ in range(2):
+        items = await services.fetch_all_swapi_resource("people")
+        assert [p["name"] for p in items] == ["Luke Skywalker"]
+        await asyncio.gather(
+            *services._refreshes.values(), return_exceptions=True
+        )
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_concurrent_misses_share_one_refresh(fresh_state):
+    """
+    Concurrent cache misses for a collection make one upstream call.
+    """
+    url = f"{BASE_SWAPI_URL}/people"
+
+    async def slow_response(request):
+        await asyncio.sleep(0.01)
+        return Response(200, json=[{"name": "Luke Skywalker"}])
+
+    route = respx.get(url).mock(side_effect=slow_response)
+
+    loads = [services.fetch_all_swapi_resource("people") for _ in range(5)]
+    tasks = asyncio.gather(*loads)
+    await asyncio.sleep(0.005)
+    assert services.pending_refreshes() == ["people"]
+
+    results = await tasks
+    assert route.call_count == 1
+    assert all(r == [{"name": "Luke Skywalker"}] for r in results)
+    assert services.pending_refreshes() == []
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """
+    closed -> open after the threshold -> half_open after the timeout.
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=10, clock=lambda: now[0]
+    )
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10.0
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20.0
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 0
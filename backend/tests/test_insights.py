@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import pytest
+from aiocache import Cache
+from httpx import AsyncClient, ASGITransport
+
+import app.services as services
+from app.insights import (
+    InsightLimitExceeded,
+    InsightService,
+    StubInsightProvider,
+    record_hash,
+)
+from app.main import app
+
+LUKE = {
+    "name": "Luke Skywalker",
+    "edited": "2014-12-20T21:17:56.891000Z",
+    "url": "https://swapi.info/api/people/1",
+}
+
+
+@pytest.fixture
+def provider():
+    return StubInsightProvider()
+
+
+@pytest.fixture
+def service(provider):
+    return InsightService(provider, cache=Cache(Cache.MEMORY))
+
+
+def test_record_hash_ignores_derived_fields():
+    """
+    homeworld_name is added by /people and must not change the hash.
+    """
+    assert record_hash(LUKE) == record_hash(
+        dict(LUKE, homeworld_name="Tatooine")
+    )
+    assert record_hash(LUKE) != record_hash(dict(LUKE, edited="2015"))
+
+
+@pytest.mark.asyncio
+async def test_repeated_insight_is_generated_once(service, provider):
+    """
+    The second request for an unchanged record is served from cache.
+    """
+    first = await service.generate(LUKE, "client-a")
+    second = await service.generate(dict(LUKE), "client-b")
+
+    assert first == second == StubInsightProvider.describe(LUKE)
+    assert provider.generated == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_batched_and_deduplicated(
+        service, provider):
+    """
+    Concurrent calls share one provider batch; duplicates share one slot.
+    """
+    leia = dict(LUKE, name="Leia Organa", url="https://swapi.info/api/people/5")
+    results = await asyncio.gather(
+        service.generate(LUKE, "a"),
+        service.generate(LUKE, "b"),
+        service.generate(leia, "c"),
+    )
+
+    assert results[0] == results[1] == StubInsightProvider.describe(LUKE)
+    assert results[2] == StubInsightProvider.describe(leia)
+    assert provider.batches == 1
+    assert provider.generated == 2
+
+
+@pytest.mark.asyncio
+async def test_per_client_concurrency_limit():
+    """
+    A client over its limit is rejected; other clients are unaffected.
+    """
+    service = InsightService(
+        StubInsightProvider(token_delay=0.01),
+        cache=Cache(Cache.MEMORY),
+        max_concurrency_per_client=1,
+    )
+    busy = service.stream(LUKE, "greedy")
+    await busy.__anext__()
+
+    with pytest.raises(InsightLimitExceeded):
+        await service.generate(LUKE, "greedy")
+    assert await service.generate(LUKE, "polite")
+
+    await busy.aclose()
+    assert await service.generate(LUKE, "greedy")
+
+
+@pytest.mark.asyncio
+async def test_insight_endpoints_json_and_stream(monkeypatch, service):
+    """
+    /simulate-ai-insight returns JSON; /stream sends tokens then done.
+    """
+    async def find_record_by_name(name):
+        return dict(LUKE, name=name)
+
+    monkeypatch.setattr(services, "find_record_by_name", find_record_by_name)
+    monkeypatch.setattr(services, "insight_service", service)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            "/api/simulate-ai-insight", params={"name": "Luke Skywalker"}
+        )
+        streamed = await ac.get(
+            "/api/simulate-ai-insight/stream",
+            params={"name": "Luke Skywalker"},
+        )
+
+    assert response.status_code == 200
+    description = response.json()["description"]
+    assert description.startswith("AI Insight for 'Luke Skywalker'")
+
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: "):])
+        for line in streamed.text.splitlines() if line.startswith("data: ")
+    ]
+    assert events[-1] == {"type": "done"}
+    assert "".join(e["token"] for e in events[:-1]) == description
+
+
+@pytest.mark.asyncio
+async def test_unresolved_names_are_not_cached(monkeypatch, service):
+    """
+    Made-up names still get an insight, but nothing is kept for them.
+    """
+    async def find_record_by_name(name):
+        return dict(LUKE) if name == LUKE["name"] else None
+
+    monkeypatch.setattr(services, "find_record_by_name", find_record_by_name)
+    monkeypatch.setattr(services, "insight_service", service)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        for n in range(5):
+            response = await ac.get(
+                "/api/simulate-ai-insight", params={"name": f"Nobody {n}"}
+            )
+            assert response.status_code == 200
+            assert "Nobody" in response.json()["description"]
+        await ac.get("/api/simulate-ai-insight", params={"name": "Nobody 0"})
+        streamed = await ac.get(
+            "/api/simulate-ai-insight/stream", params={"name": "Nobody 9"}
+        )
+        assert streamed.status_code == 200
+        await ac.get(
+            "/api/simulate-ai-insight", params={"name": LUKE["name"]}
+        )
+
+    assert list(service.cache._cache) == [
+        f"insight:{record_hash(LUKE)}"
+    ]
+    assert not service._inflight
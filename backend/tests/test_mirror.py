@@ -0,0 +1,276 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import app.services as services
+from app.main import app
+from app.mirror import SwapiMirror
+from app.stream import Broadcaster
+
+BASE = "https://swapi.info/api"
+
+PEOPLE = [
+    {
+        "name": "Luke Skywalker",
+        "homeworld": f"{BASE}/planets/1",
+        "films": [f"{BASE}/films/1"],
+        "created": "2014-12-09T13:50:51.644000Z",
+        "edited": "2014-12-20T21:17:56.891000Z",
+        "url": f"{BASE}/people/1",
+    },
+    {
+        "name": "Darth Vader",
+        "homeworld": f"{BASE}/planets/1",
+        "films": [f"{BASE}/films/1"],
+        "created": "2014-12-10T15:18:20.704000Z",
+        "edited": "2014-12-20T21:17:50.313000Z",
+        "url": f"{BASE}/people/4",
+    },
+    {
+        "name": "Leia Organa",
+        "homeworld": f"{BASE}/planets/2",
+        "films": [],
+        "created": "2014-12-10T15:20:09.791000Z",
+        "edited": "2014-12-20T21:17:50.315000Z",
+        "url": f"{BASE}/people/5",
+    },
+]
+
+PLANETS = [
+    {
+        "name": "Tatooine",
+        "residents": [f"{BASE}/people/1", f"{BASE}/people/4"],
+        "created": "2014-12-09T13:50:49.641000Z",
+        "edited": "2014-12-20T20:58:18.411000Z",
+        "url": f"{BASE}/planets/1",
+    },
+    {
+        "name": "Alderaan",
+        "residents": [f"{BASE}/people/5"],
+        "created": "2014-12-10T11:35:48.479000Z",
+        "edited": "2014-12-20T20:58:18.420000Z",
+        "url": f"{BASE}/planets/2",
+    },
+]
+
+
+@pytest.fixture
+def mirror():
+    m = SwapiMirror(":memory:")
+    m.sync_resource("people", PEOPLE)
+    m.sync_resource("planets", PLANETS)
+    yield m
+    m.close()
+
+
+def test_query_matches_in_memory_filter_and_sort(mirror):
+    """
+    SQL search/sort/pagination must agree with the in-memory helpers.
+    """
+    for search in (None, "a", "SKY"):
+        for sort_by in ("name", "created"):
+            for descending in (False, True):
+                expected = services.sort_items(
+                    services.filter_items_by_name(PEOPLE, search),
+                    sort_by,
+                    descending,
+                )
+                total, rows = mirror.query(
+                    "people", search, sort_by, descending, 0, 15
+                )
+                assert total == len(expected)
+                assert [r["url"] for r in rows] == [e["url"] for e in expected]
+
+    total, rows = mirror.query("people", offset=2, limit=2)
+    assert total == 3
+    assert [r["name"] for r in rows] == ["Luke Skywalker"]
+
+    with pytest.raises(ValueError):
+        mirror.query("people", sort_by="height")
+
+
+def test_get_by_url_and_joins(mirror):
+    """
+    Records are addressable by URL and foreign keys can be followed.
+    """
+    assert mirror.get_by_url(f"{BASE}/planets/1/")["name"] == "Tatooine"
+    assert mirror.get_by_url(f"{BASE}/planets/99") is None
+
+    residents = mirror.get_related(f"{BASE}/planets/1", "residents")
+    assert [p["name"] for p in residents] == ["Luke Skywalker", "Darth Vader"]
+
+    homeworld = mirror.get_related(f"{BASE}/people/5", "homeworld")
+    assert [p["name"] for p in homeworld] == ["Alderaan"]
+
+    assert mirror.related_names(
+        [p["url"] for p in PEOPLE], "homeworld"
+    ) == {f"{BASE}/planets/1": "Tatooine", f"{BASE}/planets/2": "Alderaan"}
+    assert mirror.related_names([], "homeworld") == {}
+
+
+def test_incremental_resync(mirror):
+    """
+    Re-sync only rewrites edited records and drops removed ones.
+    """
+    edited_luke = dict(PEOPLE[0], edited="2015-01-01T00:00:00.000000Z",
+                       homeworld=f"{BASE}/planets/2")
+    new_person = dict(PEOPLE[2], name="Han Solo", url=f"{BASE}/people/14")
+
+    counts = mirror.sync_resource(
+        "people", [edited_luke, PEOPLE[1], new_person]
+    )
+    assert counts == {"added": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+
+    # Import order is kept for updated records
+    assert [p["name"] for p in mirror.list_items("people")] == [
+        "Luke Skywalker", "Darth Vader", "Han Solo"
+    ]
+    homeworld = mirror.get_related(edited_luke["url"], "homeworld")
+    assert [p["name"] for p in homeworld] == ["Alderaan"]
+    assert mirror.get_by_url(PEOPLE[2]["url"]) is None
+    assert mirror.last_synced("people") is not None
+
+
+@pytest.mark.asyncio
+async def test_services_use_mirror_data_source(mirror, monkeypatch):
+    """
+    With SWAPI_DATA_SOURCE=mirror no upstream HTTP calls are made.
+    """
+    monkeypatch.setattr(services, "SWAPI_DATA_SOURCE", "mirror")
+    monkeypatch.setattr(services, "_mirror", mirror)
+    monkeypatch.setattr(services, "_mirror_synced_at", {})
+    await services.cache.clear()
+
+    try:
+        items = await services.fetch_all_swapi_resource("planets")
+        assert [p["name"] for p in items] == ["Tatooine", "Alderaan"]
+
+        planet = await services.fetch_swapi_resource_by_url(f"{BASE}/planets/2")
+        assert planet["name"] == "Alderaan"
+
+        page = await services.get_filtered_sorted_paginated_items(
+            "people", page=1, per_page=2, search="a", sort_by="name"
+        )
+        assert page["count"] == 3
+        assert [p["name"] for p in page["results"]] == [
+            "Darth Vader", "Leia Organa"
+        ]
+        assert page["next"] == "/people?page=2&search=a&sort_by=name&order=asc"
+    finally:
+        await services.cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_resync_from_another_process_reaches_snapshots(
+        mirror, monkeypatch):
+    """
+    A re-sync that can't clear this process's cache (the CLI runs
+    separately) still replaces the cached collection and snapshot.
+    """
+    monkeypatch.setattr(services, "SWAPI_DATA_SOURCE", "mirror")
+    monkeypatch.setattr(services, "_mirror", mirror)
+    monkeypatch.setattr(services, "_mirror_synced_at", {})
+    monkeypatch.setattr(services, "snapshots", {})
+    await services.cache.clear()
+
+    try:
+        first = await services.get_snapshot("planets")
+        assert len(first.items) == 2
+
+        # Same as `python -m app.mirror`: rows change, cache untouched
+        mirror.sync_resource("planets", PLANETS[:1])
+        assert await services.cache.exists(f"{BASE}/planets")
+
+        second = await services.get_snapshot("planets")
+        assert [p["name"] for p in second.items] == ["Tatooine"]
+        assert second.version == first.version + 1
+    finally:
+        await services.cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_people_page_resolves_homeworlds_with_one_join(
+        mirror, monkeypatch):
+    """
+    In mirror mode homeworld names come from the links table,
+    not one lookup per URL.
+    """
+    async def no_lookup(url):
+        raise AssertionError(f"unexpected lookup of {url}")
+
+    monkeypatch.setattr(services, "SWAPI_DATA_SOURCE", "mirror")
+    monkeypatch.setattr(services, "_mirror", mirror)
+    monkeypatch.setattr(services, "fetch_swapi_resource_by_url", no_lookup)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/api/people")
+
+    assert response.status_code == 200
+    assert {
+        p["name"]: p["homeworld_name"] for p in response.json()["results"]
+    } == {
+        "Luke Skywalker": "Tatooine",
+        "Darth Vader": "Tatooine",
+        "Leia Organa": "Alderaan",
+    }
+
+
+@pytest.mark.asyncio
+async def test_resync_is_published_from_paginated_reads(mirror, monkeypatch):
+    """
+    Paginated reads go straight to SQLite, but still notice an
+    out-of-process re-sync and push the diff to /stream subscribers.
+    """
+    feed = Broadcaster()
+    monkeypatch.setattr(services, "SWAPI_DATA_SOURCE", "mirror")
+    monkeypatch.setattr(services, "_mirror", mirror)
+    monkeypatch.setattr(services, "_mirror_synced_at", {})
+    monkeypatch.setattr(services, "snapshots", {})
+    monkeypatch.setattr(services, "change_feed", feed)
+    await services.cache.clear()
+
+    try:
+        await services.get_snapshot("planets")
+        cursor = feed.cursor
+
+        mirror.sync_resource("planets", PLANETS[:1])
+        page = await services.get_filtered_sorted_paginated_items(
+            "planets", page=1
+        )
+
+        assert page["count"] == 1
+        events = feed.events_after(cursor)
+        assert len(events) == 1
+        assert events[0][1]["removed"] == [f"{BASE}/planets/2"]
+    finally:
+        await services.cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_readiness_cold_until_mirror_is_imported(monkeypatch):
+    """
+    An empty mirror database serves empty lists; it must not report
+    ready until the collections have been imported.
+    """
+    empty = SwapiMirror(":memory:")
+    monkeypatch.setattr(services, "SWAPI_DATA_SOURCE", "mirror")
+    monkeypatch.setattr(services, "_mirror", empty)
+    monkeypatch.setattr(services, "_mirror_synced_at", {})
+    monkeypatch.setattr(services, "snapshots", {})
+    await services.cache.clear()
+
+    try:
+        await services.warm_up(retry_delay=0)
+        report = await services.readiness()
+        assert report["status"] == "not_ready"
+        assert report["resources"]["people"] == {"state": "cold"}
+
+        empty.sync_resource("people", PEOPLE)
+        empty.sync_resource("planets", PLANETS)
+        await services.warm_up(retry_delay=0)
+        report = await services.readiness()
+        assert report["status"] == "ready"
+        assert report["resources"]["people"]["records"] == 3
+    finally:
+        empty.close()
+        await services.cache.clear()
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app import profiling
+from app.main import app as main_app
+from app.profiling import ProfileStore, ProfilingMiddleware
+
+
+def _make_app(store, **options):
+    app = FastAPI()
+
+    @app.get("/api/sleep")
+    async def sleep(ms: int = 0):
+        await asyncio.sleep(ms / 1000)
+        return {"slept": ms}
+
+    app.add_middleware(ProfilingMiddleware, store=store, **options)
+    app.include_router(profiling.router, prefix="/api")
+    return app
+
+
+def test_profile_store_keeps_slowest():
+    """
+    The store is bounded and evicts the fastest entry first.
+    """
+    store = ProfileStore(size=3)
+    for duration in (0.5, 0.1, 0.9, 0.3, 0.7):
+        store.add(duration, {"duration": duration})
+
+    assert [e["duration"] for e in store.slowest()] == [0.9, 0.7, 0.5]
+    assert not store.would_keep(0.2)
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_are_profiled(monkeypatch):
+    """
+    With sample rate 1 every request is captured and readable with the token.
+    """
+    monkeypatch.setenv("PROFILING_TOKEN", "s3cret")
+    store = ProfileStore(size=2)
+    monkeypatch.setattr(profiling, "profile_store", store)
+    app = _make_app(store, sample_rate=1.0, header_enabled=False)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        for ms in (1, 30, 10):
+            await ac.get("/api/sleep", params={"ms": ms})
+        forbidden = await ac.get("/api/debug/profiles")
+        response = await ac.get(
+            "/api/debug/profiles", headers={"X-Debug-Token": "s3cret"}
+        )
+
+    assert forbidden.status_code == 403
+    profiles = response.json()["profiles"]
+    assert [p["query"] for p in profiles] == ["ms=30", "ms=10"]
+    assert profiles[0]["status"] == 200
+    assert profiles[0]["duration_ms"] >= 30
+    assert "function calls" in profiles[0]["profile"]
+
+
+@pytest.mark.asyncio
+async def test_keep_zero_profiles_without_storing(monkeypatch):
+    """
+    PROFILING_KEEP=0 keeps nothing and must not break profiled requests.
+    """
+    monkeypatch.setenv("PROFILING_KEEP", "0")
+    store = ProfileStore()
+    app = _make_app(store, sample_rate=1.0, header_enabled=False)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/api/sleep", params={"ms": 1})
+
+    assert response.status_code == 200
+    assert not store.would_keep(1.0)
+    assert store.slowest() == []
+
+
+@pytest.mark.asyncio
+async def test_header_opt_in_requires_token():
+    """
+    X-Profile only triggers profiling together with a valid debug token.
+    """
+    store = ProfileStore(size=5)
+    app = _make_app(store, sample_rate=0, header_enabled=True, token="s3cret")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/api/sleep")
+        await ac.get("/api/sleep", headers={"X-Profile": "1"})
+        await ac.get(
+            "/api/sleep",
+            headers={"X-Profile": "1", "X-Debug-Token": "wrong"},
+        )
+        await ac.get(
+            "/api/sleep",
+            headers={"X-Profile": "1", "X-Debug-Token": "s3cret"},
+        )
+
+    assert len(store.slowest()) == 1
+
+
+def test_profiling_disabled_by_default():
+    """
+    Without configuration neither the middleware nor the endpoint exist.
+    """
+    assert not any(
+        m.cls is ProfilingMiddleware for m in main_app.user_middleware
+    )
+    assert "/api/debug/profiles" not in {r.path for r in main_app.routes}
@@ -0,0 +1,254 @@
+import asyncio
+import time
+
+import pytest
+from aiocache import Cache
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.ratelimit import (
+    CacheWindowLimiter,
+    LoadShedder,
+    RateLimitMiddleware,
+    TokenBucketLimiter,
+    client_key,
+    middleware_options_from_env,
+    parse_networks,
+)
+
+PROXY = parse_networks(["10.0.0.0/24"])
+
+
+def _make_app(**options):
+    app = FastAPI()
+
+    @app.get("/api/people")
+    async def people(ms: int = 0):
+        await asyncio.sleep(ms / 1000)
+        return {"ok": True}
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(RateLimitMiddleware, **options)
+    return app
+
+
+def test_token_bucket_refills_and_reports_retry_after():
+    """
+    A client gets `burst` requests at once, then `rate` per second.
+    """
+    now = [0.0]
+    limiter = TokenBucketLimiter(rate=2, burst=3, clock=lambda: now[0])
+
+    assert [limiter.consume("a")[0] for _ in range(4)] == [
+        True, True, True, False
+    ]
+    assert limiter.consume("a") == (False, 0.5)
+    assert limiter.consume("b")[0]  # other clients are unaffected
+
+    now[0] = 0.5
+    assert limiter.consume("a")[0]
+    assert not limiter.consume("a")[0]
+
+
+def test_token_bucket_evicts_least_recent_clients():
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_clients=2)
+    for key in ("a", "b", "a", "c"):
+        limiter.consume(key)
+    assert len(limiter) == 2
+    # "b" was least recently seen and got evicted: it starts full again
+    assert limiter.consume("b")[0]
+    assert not limiter.consume("c")[0]
+
+
+def test_client_key_prefers_known_api_key_then_proxy_address():
+    scope = {
+        "client": ("10.0.0.2", 1234),
+        "headers": [
+            (b"x-forwarded-for", b"1.1.1.1, 203.0.113.7, 10.0.0.9"),
+            (b"x-api-key", b"partner"),
+        ],
+    }
+    assert client_key(scope, frozenset({"partner"}), PROXY) == "key:partner"
+    # Unknown keys don't earn their own bucket. Trusted hops (10.0.0.x)
+    # are skipped and the forged left-most entry is ignored.
+    assert client_key(scope, trusted_proxies=PROXY) == "203.0.113.7"
+    assert client_key({"client": ("10.0.0.2", 1), "headers": []},
+                      trusted_proxies=PROXY) == "10.0.0.2"
+
+
+def test_client_key_ignores_forwarded_for_from_untrusted_peer():
+    """
+    A direct caller can't pick its bucket by forging X-Forwarded-For.
+    """
+    scope = {
+        "client": ("198.51.100.9", 1234),
+        "headers": [(b"x-forwarded-for", b"203.0.113.7")],
+    }
+    assert client_key(scope) == "198.51.100.9"
+    assert client_key(scope, trusted_proxies=PROXY) == "198.51.100.9"
+
+
+@pytest.mark.asyncio
+async def test_cache_window_limiter_shares_counts():
+    """
+    Two limiters on the same cache enforce one combined limit.
+    """
+    cache = Cache(Cache.MEMORY)
+    now = [100.0]
+    first = CacheWindowLimiter(cache, rate=1, burst=2, clock=lambda: now[0])
+    second = CacheWindowLimiter(cache, rate=1, burst=2, clock=lambda: now[0])
+
+    assert (await first.allow("a"))[0]
+    assert (await second.allow("a"))[0]
+    assert await first.allow("a") == (False, 2.0)
+
+    now[0] = 102.0  # next window
+    assert (await second.allow("a"))[0]
+
+
+@pytest.mark.asyncio
+async def test_load_shedder_queues_then_sheds():
+    """
+    Waiters get a freed slot in order; those waiting too long are shed.
+    """
+    shedder = LoadShedder(max_concurrency=1, max_queue_wait=0.05)
+    assert await shedder.acquire()
+
+    waiting = asyncio.create_task(shedder.acquire())
+    await asyncio.sleep(0)
+    assert shedder.queued == 1
+    shedder.release()
+    assert await waiting
+    assert shedder.active == 1
+
+    assert not await shedder.acquire()  # times out after 50ms
+    shedder.release()
+    assert shedder.active == 0 and shedder.queued == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("release_at", [0.045, 0.055])
+async def test_load_shedder_release_and_timeout_in_same_tick(release_at):
+    """
+    A stalled loop can run release() and the queue-wait timeout in one
+    iteration, in either order; the slot must never be leaked.
+    """
+    shedder = LoadShedder(max_concurrency=1, max_queue_wait=0.05)
+    assert await shedder.acquire()
+    waiting = asyncio.create_task(shedder.acquire())
+    await asyncio.sleep(0)
+
+    asyncio.get_running_loop().call_later(release_at, shedder.release)
+    time.sleep(0.06)  # stall past both deadlines
+    acquired = await waiting
+
+    assert shedder.active == (1 if acquired else 0)
+    if acquired:
+        shedder.release()
+    assert shedder.active == 0 and shedder.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_limits_abusive_client_only():
+    """
+    One client hitting its limit gets 429 + Retry-After; others and
+    health checks are unaffected.
+    """
+    app = _make_app(
+        limiter=TokenBucketLimiter(rate=1, burst=2),
+        trusted_proxies=parse_networks(["127.0.0.1"]),
+    )
+    # Requests arrive via a trusted proxy at 127.0.0.1
+    transport = ASGITransport(app=app, client=("127.0.0.1", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        abusive = {"X-Forwarded-For": "198.51.100.1"}
+        statuses = [
+            (await ac.get("/api/people", headers=abusive)).status_code
+            for _ in range(3)
+        ]
+        limited = await ac.get("/api/people", headers=abusive)
+        health = await ac.get("/api/health", headers=abusive)
+        polite = await ac.get(
+            "/api/people", headers={"X-Forwarded-For": "198.51.100.2"}
+        )
+
+    assert statuses == [200, 200, 429]
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert health.status_code == 200
+    assert polite.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_load_when_saturated():
+    """
+    With every slot busy past the queue wait, new requests get 503.
+    """
+    shedder = LoadShedder(max_concurrency=1, max_queue_wait=0.01)
+    app = _make_app(shedder=shedder)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        slow = asyncio.create_task(ac.get("/api/people", params={"ms": 100}))
+        await asyncio.sleep(0.02)
+        shed = await ac.get("/api/people")
+        health = await ac.get("/api/health")
+        assert (await slow).status_code == 200
+        after = await ac.get("/api/people")
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert health.status_code == 200
+    assert after.status_code == 200
+    assert shedder.active == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_spoofed_forwarded_for_shares_one_bucket():
+    """
+    Rotating X-Forwarded-For from an untrusted peer doesn't reset the
+    limit: all requests count against the peer address.
+    """
+    app = _make_app(
+        limiter=TokenBucketLimiter(rate=1, burst=2),
+        trusted_proxies=PROXY,
+    )
+    transport = ASGITransport(app=app, client=("198.51.100.9", 123))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        statuses = [
+            (await ac.get(
+                "/api/people", headers={"X-Forwarded-For": f"192.0.2.{n}"}
+            )).status_code
+            for n in range(3)
+        ]
+
+    assert statuses == [200, 200, 429]
+
+
+def test_per_client_limit_needs_trusted_proxies(monkeypatch, capsys):
+    """
+    Without trusted proxies, clients behind a load balancer would share
+    its buckets: per-client limiting stays off (with a warning) unless
+    forced, while load shedding stays on.
+    """
+    monkeypatch.delenv("RATE_LIMIT_TRUSTED_PROXIES", raising=False)
+    monkeypatch.delenv("RATE_LIMIT_PER_CLIENT", raising=False)
+    options = middleware_options_from_env(Cache(Cache.MEMORY))
+    assert options["limiter"] is None
+    assert isinstance(options["shedder"], LoadShedder)
+    assert "RATE_LIMIT_TRUSTED_PROXIES" in capsys.readouterr().out
+
+    monkeypatch.setenv("RATE_LIMIT_PER_CLIENT", "1")
+    options = middleware_options_from_env(Cache(Cache.MEMORY))
+    assert isinstance(options["limiter"], TokenBucketLimiter)
+
+    monkeypatch.delenv("RATE_LIMIT_PER_CLIENT")
+    monkeypatch.setenv("RATE_LIMIT_TRUSTED_PROXIES", "10.0.0.0/16")
+    options = middleware_options_from_env(Cache(Cache.MEMORY))
+    assert isinstance(options["limiter"], TokenBucketLimiter)
+    assert options["trusted_proxies"] == parse_networks(["10.0.0.0/16"])
+
+    monkeypatch.setenv("RATE_LIMIT_PER_CLIENT", "0")
+    assert middleware_options_from_env(Cache(Cache.MEMORY))["limiter"] is None
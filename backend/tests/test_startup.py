@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE = os.path.join(BACKEND_DIR, "tests", "startup_probe.py")
+
+# Generous ceilings so slow CI runners don't flake; the point is to
+# catch regressions like an eager heavy import, not to pin a number.
+IMPORT_BUDGET_MS = 3000
+FIRST_HEALTHY_BUDGET_MS = 4000
+
+
+def _run(args, app_env):
+    env = dict(os.environ, APP_ENV=app_env)
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_time_budget():
+    """
+    `python -X importtime -c "import app.main"` stays within budget.
+    """
+    result = _run(["-X", "importtime", "-c", "import app.main"], "production")
+    line = next(
+        line for line in result.stderr.splitlines()
+        if line.rstrip().endswith("| app.main")
+    )
+    cumulative_us = int(line.split("|")[1])
+    print(f"import app.main: {cumulative_us / 1000:.1f} ms")
+    assert cumulative_us / 1000 < IMPORT_BUDGET_MS
+
+
+@pytest.mark.parametrize("app_env, docs_status", [
+    ("production", 404),
+    ("development", 200),
+])
+def test_time_to_first_healthy_response(app_env, docs_status):
+    """
+    A cold process answers /api/health quickly, without loading optional
+    backends; production mode serves no API docs.
+    """
+    # The report is the last line; the app may log at startup
+    probe = json.loads(_run([PROBE], app_env).stdout.splitlines()[-1])
+    print(f"{app_env}: {probe}")
+
+    assert probe["health_status"] == 200
+    assert probe["first_healthy_ms"] < FIRST_HEALTHY_BUDGET_MS
+    assert probe["optional_modules"] == []
+    assert probe["docs_status"] == docs_status
@@ -0,0 +1,90 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import app.services as services
+from app.main import app
+from app.stats import compute_rollups, parse_number
+
+PLANETS = [
+    {"name": "Tatooine", "climate": "arid", "population": "200000",
+     "diameter": "10465", "films": ["f/1", "f/3"]},
+    {"name": "Alderaan", "climate": "temperate", "population": "2000000000",
+     "diameter": "12500", "films": ["f/1"]},
+    {"name": "Bespin", "climate": "temperate", "population": "6000000",
+     "diameter": "118000", "films": ["f/2"]},
+    {"name": "Hoth", "climate": "frozen, temperate", "population": "unknown",
+     "diameter": "7200", "films": ["f/2"]},
+]
+
+
+def test_parse_number_normalizes_swapi_strings():
+    assert parse_number("1,358") == 1358
+    assert parse_number("1.0") == 1
+    assert parse_number("0.75") == 0.75
+    assert parse_number(4) == 4
+    for value in ("unknown", "n/a", "30-165", "", None, "nan"):
+        assert parse_number(value) is None
+
+
+def test_compute_rollups_totals_and_groups():
+    """
+    Unknown values are skipped; multi-valued fields count in every group.
+    """
+    rollups = compute_rollups("planets", PLANETS)
+
+    assert rollups["count"] == 4
+    assert rollups["fields"]["population"] == {
+        "count": 3, "sum": 2006200000, "min": 200000, "max": 2000000000,
+    }
+
+    by_climate = rollups["groups"]["climate"]
+    assert by_climate["temperate"]["count"] == 3
+    assert by_climate["frozen"]["count"] == 1
+    assert by_climate["temperate"]["fields"]["population"]["sum"] == 2006000000
+    assert by_climate["temperate"]["fields"]["diameter"]["max"] == 118000
+
+    assert {k: v["count"] for k, v in rollups["groups"]["films"].items()} == {
+        "f/1": 2, "f/3": 1, "f/2": 2,
+    }
+
+
+def test_compute_rollups_unknown_resource():
+    assert compute_rollups("droids", [{"name": "R2-D2"}]) == {
+        "count": 1, "fields": {}, "groups": {},
+    }
+
+
+@pytest.mark.asyncio
+async def test_stats_endpoint(monkeypatch):
+    """
+    /api/stats/{resource} serves the snapshot's rollups, optionally grouped.
+    """
+    async def fetch_all_swapi_resource(resource):
+        return PLANETS
+
+    monkeypatch.setattr(
+        services, "fetch_all_swapi_resource", fetch_all_swapi_resource
+    )
+    monkeypatch.setattr(services, "snapshots", {})
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        overall = await ac.get("/api/stats/planets")
+        grouped = await ac.get(
+            "/api/stats/planets", params={"group_by": "climate"}
+        )
+        invalid = await ac.get(
+            "/api/stats/planets", params={"group_by": "name"}
+        )
+        unknown = await ac.get("/api/stats/unicorns")
+
+    assert overall.status_code == 200
+    data = overall.json()
+    assert data["version"] == 1
+    assert data["fields"]["diameter"]["min"] == 7200
+    assert "groups" not in data
+    assert "climate" in data["group_by_fields"]
+
+    assert grouped.json()["groups"]["arid"]["count"] == 1
+    assert invalid.status_code == 400
+    assert unknown.status_code == 404
@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import pytest
+from starlette.requests import Request
+
+import app.services as services
+from app.api import stream_changes
+from app.stream import Broadcaster, change_feed, diff_records, format_sse
+
+
+def _record(n, edited="2014-12-20T00:00:00Z"):
+    return {"name": f"Item {n}", "url": f"https://x/{n}", "edited": edited}
+
+
+def test_diff_records_by_url_and_edited():
+    """
+    Only new or re-edited records are reported, removals by URL.
+    """
+    previous = [_record(1), _record(2), _record(3)]
+    current = [_record(1), _record(2, "2015-01-01T00:00:00Z"), _record(4)]
+
+    diff = diff_records(previous, current)
+    assert [r["url"] for r in diff["changed"]] == ["https://x/2", "https://x/4"]
+    assert diff["removed"] == ["https://x/3"]
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_fans_out_to_all_subscribers():
+    """
+    Every waiting subscriber receives the same published event.
+    """
+    feed = Broadcaster()
+    cursor = feed.cursor
+
+    waiters = [
+        asyncio.create_task(feed.wait(cursor, timeout=1)) for _ in range(100)
+    ]
+    await asyncio.sleep(0)
+    feed.publish({"type": "snapshot", "resource": "people"})
+
+    results = await asyncio.gather(*waiters)
+    assert all(r == [(1, {"type": "snapshot", "resource": "people"})]
+               for r in results)
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_timeout_and_resync():
+    """
+    Idle waits time out empty; lagging subscribers get a resync event.
+    """
+    feed = Broadcaster(history=2)
+    assert await feed.wait(feed.cursor, timeout=0.01) == []
+
+    for n in range(5):
+        feed.publish({"type": "snapshot", "n": n})
+    assert [e["n"] for _, e in feed.events_after(3)] == [3, 4]
+    assert feed.events_after(0) == [(5, {"type": "resync"})]
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_resyncs_cursor_from_previous_process():
+    """
+    A Last-Event-ID from before a restart is ahead of the new log:
+    the client is told to resync instead of silently missing events.
+    """
+    feed = Broadcaster()
+    assert feed.events_after(50) == [(0, {"type": "resync"})]
+
+    feed.publish({"type": "snapshot", "n": 0})
+    assert await feed.wait(50, timeout=0.01) == [(1, {"type": "resync"})]
+
+
+def test_format_sse():
+    assert format_sse(7, {"type": "snapshot", "version": 2}) == (
+        'id: 7\nevent: snapshot\ndata: {"type":"snapshot","version":2}\n\n'
+    )
+
+
+@pytest.mark.asyncio
+async def test_publish_snapshot_pushes_diff(monkeypatch):
+    """
+    Re-publishing a collection bumps its version and sends only the diff.
+    """
+    feed = Broadcaster()
+    monkeypatch.setattr(services, "change_feed", feed)
+    monkeypatch.setattr(services, "snapshots", {})
+
+    services.publish_snapshot("people", [_record(1), _record(2)])
+    snapshot = services.publish_snapshot(
+        "people", [_record(1), _record(2, "2015-01-01T00:00:00Z")]
+    )
+    assert snapshot.version == 2
+
+    (_, event), = feed.events_after(1)
+    assert event["version"] == 2
+    assert [r["url"] for r in event["changed"]] == ["https://x/2"]
+    assert event["removed"] == []
+
+    # Identical data neither wakes subscribers nor bumps the version
+    same = services.publish_snapshot(
+        "people", [_record(1), _record(2, "2015-01-01T00:00:00Z")]
+    )
+    assert feed.cursor == 2
+    assert same is snapshot and same.version == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_sends_versions_first(monkeypatch):
+    """
+    A new /stream connection starts with the current dataset versions.
+    """
+    monkeypatch.setattr(services, "snapshots", {})
+    services.publish_snapshot("planets", [_record(1)])
+
+    request = Request({"type": "http", "headers": []})
+    response = await stream_changes(request)
+    assert response.media_type == "text/event-stream"
+
+    first = await response.body_iterator.__anext__()
+    payload = json.loads(first.split("data: ", 1)[1])
+    assert payload == {"type": "versions", "versions": {"planets": 1}}
+    await response.body_iterator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_resyncs_event_id_from_another_process():
+    """
+    A Last-Event-ID from another log (restart or another task) gets a
+    resync, even when its sequence number is valid in this log;
+    this log's own ids resume where they left off.
+    """
+    change_feed.publish({"type": "snapshot", "resource": "people"})
+    current = change_feed.cursor
+
+    async def first_events(last_event_id, count):
+        request = Request({"type": "http", "headers": [
+            (b"last-event-id", last_event_id.encode())
+        ]})
+        response = await stream_changes(request)
+        events = [
+            await response.body_iterator.__anext__() for _ in range(count)
+        ]
+        await response.body_iterator.aclose()
+        return events
+
+    _, resync = await first_events(f"0123456789ab:{current - 1}", 2)
+    assert resync.startswith(f"id: {change_feed.event_id(current)}\n")
+    assert "event: resync" in resync
+
+    _, replayed = await first_events(change_feed.event_id(current - 1), 2)
+    assert replayed.startswith(f"id: {change_feed.event_id(current)}\n")
+    assert "event: snapshot" in replayed
+
+
+def test_broadcaster_event_ids_carry_epoch():
+    feed, other = Broadcaster(), Broadcaster()
+    assert feed.resume_cursor(feed.event_id(3)) == 3
+    assert feed.resume_cursor(other.event_id(3)) is None
+    assert feed.resume_cursor("3") is None
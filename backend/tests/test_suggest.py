@@ -0,0 +1,90 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import app.services as services
+from app.main import app
+from app.suggest import SuggestIndex
+
+NAMES = [
+    "Luke Skywalker",
+    "Anakin Skywalker",
+    "Leia Organa",
+    "Lobot",
+    "Shmi Skywalker",
+    "Darth Vader",
+    "Owen Lars",
+    "Beru Whitesun lars",
+]
+
+
+@pytest.fixture
+def index():
+    return SuggestIndex(NAMES)
+
+
+def test_prefix_matches_rank_before_word_and_substring(index):
+    """
+    Name prefix first, then word prefix, then anywhere in the name.
+    """
+    assert index.suggest("l") == [
+        "Leia Organa", "Lobot", "Luke Skywalker",  # name prefix
+        "Beru Whitesun lars", "Owen Lars",  # word prefix
+        "Anakin Skywalker", "Shmi Skywalker",  # substring
+    ]
+    assert index.suggest("SKY") == [
+        "Anakin Skywalker", "Luke Skywalker", "Shmi Skywalker"
+    ]
+
+
+def test_limit_and_empty_query(index):
+    assert index.suggest("l", limit=2) == ["Leia Organa", "Lobot"]
+    assert index.suggest("   ") == []
+    assert index.suggest("zzz") == []
+
+
+def test_fuzzy_tolerates_misspelling(index):
+    """
+    Fuzzy mode finds "Skywalker" from "Skywaker"; strict mode does not.
+    """
+    assert index.suggest("Skywaker") == []
+    assert index.suggest("Skywaker", fuzzy=True) == [
+        "Anakin Skywalker", "Luke Skywalker", "Shmi Skywalker"
+    ]
+
+
+def test_fuzzy_matches_misspelled_full_names(index):
+    """
+    Each word of a multi-word query is matched on its own, and every
+    word has to match; the last one may still be a partial word.
+    """
+    assert index.suggest("luke skywaker", fuzzy=True) == ["Luke Skywalker"]
+    assert index.suggest("darth vadr", fuzzy=True) == ["Darth Vader"]
+    assert index.suggest("anakn sky", fuzzy=True) == ["Anakin Skywalker"]
+    assert index.suggest("luke organa", fuzzy=True) == []
+
+
+@pytest.mark.asyncio
+async def test_suggest_endpoint(monkeypatch):
+    """
+    /api/{resource}/suggest returns only names, and 404s unknown resources.
+    """
+    people = [{"name": name} for name in NAMES]
+
+    async def fetch_all_swapi_resource(resource):
+        return people
+
+    monkeypatch.setattr(
+        services, "fetch_all_swapi_resource", fetch_all_swapi_resource
+    )
+    monkeypatch.setattr(services, "snapshots", {})
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            "/api/people/suggest", params={"q": "lu", "limit": 5}
+        )
+        unknown = await ac.get("/api/unicorns/suggest", params={"q": "x"})
+
+    assert response.status_code == 200
+    assert response.json() == {"query": "lu", "suggestions": ["Luke Skywalker"]}
+    assert unknown.status_code == 404
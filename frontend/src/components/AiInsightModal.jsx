@@ -3,7 +3,7 @@
 import { Dialog, DialogBackdrop, DialogPanel, DialogTitle } from "@headlessui/react";
 import { XMarkIcon } from "@heroicons/react/24/outline";
 
-export default function AiInsightModal({ name, description, onClose }) {
+export default function AiInsightModal({ name, description, streaming = false, onClose }) {
   return (
     <Dialog open={!!name} onClose={onClose} className="relative z-50">
       <DialogBackdrop className="fixed inset-0 bg-gray-400/50 bg-opacity-50" />
@@ -25,7 +25,10 @@ export default function AiInsightModal({ name, description, onClose }) {
               <DialogTitle className="text-white text-2xl font-bold">{name} - AI Insight ✨</DialogTitle>
             </div>
 
-            <p className="mt-4 text-gray-300">{description}</p>
+            <p className="mt-4 text-gray-300" aria-live="polite">
+              {description}
+              {streaming && <span className="ml-0.5 animate-pulse">▍</span>}
+            </p>
 
             <div className="mt-6 text-right">
               <button
@@ -1,7 +1,7 @@
 "use client";
 
-import React, { useState } from "react";
-import { fetchPeople, fetchAiInsight } from "@/lib/swapiClient";
+import React, { useState, useRef } from "react";
+import { fetchPeople, fetchSuggestions, streamAiInsight } from "@/lib/swapiClient";
 import { useSwapiTable } from "@/lib/useSwapiTable";
 import SkeletonRow from "./SkeletonRow";
 import Pagination from "./Pagination";
@@ -9,6 +9,8 @@ import SearchBar from "./SearchBar";
 import { SortArrow } from "./SortArrow";
 import AiInsightModal from "./AiInsightModal";
 
+const suggestPeople = (query) => fetchSuggestions("people", query);
+
 export default function PeopleTable() {
   const {
     items: people,
@@ -21,28 +23,30 @@ export default function PeopleTable() {
     setPage,
     handleSearch,
     handleSort,
-  } = useSwapiTable(fetchPeople, "name");
+  } = useSwapiTable(fetchPeople, "name", "people");
 
   const [selectedPerson, setSelectedPerson] = useState(null);
   const [insightDescription, setInsightDescription] = useState("");
   const [loadingInsight, setLoadingInsight] = useState(false);
+  const closeInsightStream = useRef(null);
 
-  async function handleFetchAiInsight(personName) {
+  function handleFetchAiInsight(personName) {
+    closeInsightStream.current?.();
     setLoadingInsight(true);
-    try {
-      setInsightDescription("");
-      const insight = await fetchAiInsight(personName);
-      // insight is an object, so extract description
-      setInsightDescription(insight.description || "No AI insight available.");
-      const person = people.find((p) => p.name === personName);
-      setSelectedPerson(person);
-    } catch (e) {
-      console.error("Error fetching AI insight:", e);
-      setInsightDescription("Failed to load AI insight.");
-      setSelectedPerson({ name: personName, url: null });
-    } finally {
-      setLoadingInsight(false);
-    }
+    setInsightDescription("");
+    // open the modal right away and let tokens stream into it
+    const person = people.find((p) => p.name === personName);
+    setSelectedPerson(person || { name: personName, url: null });
+
+    closeInsightStream.current = streamAiInsight(personName, {
+      onToken: (token) => setInsightDescription((text) => text + token),
+      onDone: () => setLoadingInsight(false),
+      onError: (e) => {
+        console.error("Error fetching AI insight:", e);
+        setInsightDescription("Failed to load AI insight.");
+        setLoadingInsight(false);
+      },
+    });
   }
 
   const BASE_API_URL = process.env.NEXT_PUBLIC_BACKEND_URL || "/api";
@@ -68,6 +72,7 @@ export default function PeopleTable() {
           <SearchBar
             placeholder="Search people by name..."
             onSearch={handleSearch}
+            onSuggest={suggestPeople}
           />
         </div>
       </div>
@@ -195,7 +200,12 @@ export default function PeopleTable() {
             <AiInsightModal
               name={selectedPerson?.name}
               description={insightDescription}
-              onClose={() => setSelectedPerson(null)}
+              streaming={loadingInsight}
+              onClose={() => {
+                closeInsightStream.current?.();
+                setLoadingInsight(false);
+                setSelectedPerson(null);
+              }}
             />
           </>
         )}
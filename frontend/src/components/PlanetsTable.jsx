@@ -1,7 +1,7 @@
 "use client";
 
-import React, { useState } from "react";
-import { fetchPlanets, fetchAiInsight } from "@/lib/swapiClient";
+import React, { useState, useRef } from "react";
+import { fetchPlanets, fetchSuggestions, streamAiInsight } from "@/lib/swapiClient";
 import Pagination from "./Pagination";
 import SearchBar from "./SearchBar";
 import SkeletonRow from "./SkeletonRow";
@@ -13,6 +13,8 @@ function classNames(...classes) {
   return classes.filter(Boolean).join(" ");
 }
 
+const suggestPlanets = (query) => fetchSuggestions("planets", query);
+
 export default function PlanetsTable() {
   const {
     items: planets,
@@ -25,7 +27,7 @@ export default function PlanetsTable() {
     setPage,
     handleSearch,
     handleSort,
-  } = useSwapiTable(fetchPlanets, "name");
+  } = useSwapiTable(fetchPlanets, "name", "planets");
 
   const getPlanetUrl = (planetUrl) => {
     // Use regex to extract the numeric ID from the personUrl
@@ -39,23 +41,25 @@ export default function PlanetsTable() {
   const [selectedPlanet, setSelectedPlanet] = useState(null);
   const [insightDescription, setInsightDescription] = useState("");
   const [loadingInsight, setLoadingInsight] = useState(false);
+  const closeInsightStream = useRef(null);
 
-  async function handleFetchAiInsight(planetName) {
+  function handleFetchAiInsight(planetName) {
+    closeInsightStream.current?.();
     setLoadingInsight(true);
-    try {
-      setInsightDescription("");
-      const insight = await fetchAiInsight(planetName);
-      setInsightDescription(insight.description || "No AI insight available.");
+    setInsightDescription("");
+    // open the modal right away and let tokens stream into it
+    const planet = planets.find((p) => p.name === planetName);
+    setSelectedPlanet(planet || { name: planetName, url: null });
 
-      const planet = planets.find((p) => p.name === planetName);
-      setSelectedPlanet(planet);
-    } catch (e) {
-      console.error("Error fetching AI insight:", e);
-      setInsightDescription("Failed to load AI insight.");
-      setSelectedPlanet({ name: planetName, url: null });
-    } finally {
-      setLoadingInsight(false);
-    }
+    closeInsightStream.current = streamAiInsight(planetName, {
+      onToken: (token) => setInsightDescription((text) => text + token),
+      onDone: () => setLoadingInsight(false),
+      onError: (e) => {
+        console.error("Error fetching AI insight:", e);
+        setInsightDescription("Failed to load AI insight.");
+        setLoadingInsight(false);
+      },
+    });
   }
 
   return (
@@ -68,6 +72,7 @@ export default function PlanetsTable() {
           <SearchBar
             placeholder="Search planets by name..."
             onSearch={handleSearch}
+            onSuggest={suggestPlanets}
           />
         </div>
       </div>
@@ -184,7 +189,12 @@ export default function PlanetsTable() {
             <AiInsightModal
               name={selectedPlanet?.name}
               description={insightDescription}
-              onClose={() => setSelectedPlanet(null)}
+              streaming={loadingInsight}
+              onClose={() => {
+                closeInsightStream.current?.();
+                setLoadingInsight(false);
+                setSelectedPlanet(null);
+              }}
             />
           </>
         )}
@@ -1,9 +1,18 @@
 "use client";
 
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useId } from "react";
 
-export default function SearchBar({ placeholder = "Search...", onSearch, debounceTime = 300 }) {
+export default function SearchBar({
+  placeholder = "Search...",
+  onSearch,
+  onSuggest,
+  debounceTime = 300,
+  suggestDebounceTime = 100,
+}) {
   const [input, setInput] = useState("");
+  const [suggestions, setSuggestions] = useState([]);
+  const listId = useId();
+
   useEffect(() => {
     const handler = setTimeout(() => {
       onSearch(input.trim());
@@ -14,6 +23,25 @@ export default function SearchBar({ placeholder = "Search...", onSearch, debounc
     };
   }, [input, debounceTime, onSearch]);
 
+  // Lightweight name suggestions, fetched sooner than the full search
+  useEffect(() => {
+    if (!onSuggest) return;
+    let cancelled = false;
+    const handler = setTimeout(async () => {
+      try {
+        const names = await onSuggest(input.trim());
+        if (!cancelled) setSuggestions(names);
+      } catch (e) {
+        console.error("Error fetching suggestions", e);
+      }
+    }, suggestDebounceTime);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(handler);
+    };
+  }, [input, suggestDebounceTime, onSuggest]);
+
   return (
     <div className="mb-4 w-full max-w-md">
       <input
@@ -23,7 +51,15 @@ export default function SearchBar({ placeholder = "Search...", onSearch, debounc
         value={input}
         onChange={(e) => setInput(e.target.value)}
         aria-label="Search"
+        list={onSuggest ? listId : undefined}
       />
+      {onSuggest && (
+        <datalist id={listId}>
+          {suggestions.map((name) => (
+            <option key={name} value={name} />
+          ))}
+        </datalist>
+      )}
     </div>
   );
 }
@@ -43,6 +43,20 @@ export async function fetchPlanets(params = {}) {
   return fetcher(url.toString()); // This returns { count, next, previous, results }
 }
 
+/**
+ * Fetch typeahead suggestions (names only) for a resource
+ * @param {string} resource - e.g. "people" or "planets"
+ * @param {string} query
+ */
+export async function fetchSuggestions(resource, query) {
+  if (!query) return [];
+  const url = makeUrl(`/${resource}/suggest`);
+  url.searchParams.append("q", query);
+  url.searchParams.append("fuzzy", "true");
+  const data = await fetcher(url.toString()); // This returns { query, suggestions }
+  return data.suggestions;
+}
+
 /**
  * Fetch AI-generated insight for a person or planet by name
  * @param {string} name
@@ -53,3 +67,53 @@ export async function fetchAiInsight(name) {
   url.searchParams.append("name", name);
   return fetcher(url.toString());
 }
+
+/**
+ * Stream an AI insight token by token over SSE.
+ * Falls back to the plain JSON endpoint when EventSource is unavailable.
+ * @param {string} name
+ * @param {object} handlers - onToken(token), onDone(), onError(error)
+ * @returns {function} cancel
+ */
+export function streamAiInsight(name, { onToken, onDone, onError }) {
+  if (typeof window === "undefined" || !window.EventSource) {
+    fetchAiInsight(name)
+      .then((insight) => {
+        onToken(insight.description);
+        onDone();
+      })
+      .catch(onError);
+    return () => {};
+  }
+
+  const url = makeUrl("/simulate-ai-insight/stream");
+  url.searchParams.append("name", name);
+  const source = new EventSource(url.toString());
+
+  source.addEventListener("token", (e) => onToken(JSON.parse(e.data).token));
+  source.addEventListener("done", () => {
+    source.close();
+    onDone();
+  });
+  // Server-sent "error" events carry data; connection errors (e.g. 429) don't
+  source.addEventListener("error", (e) => {
+    source.close();
+    onError(new Error(e.data ? JSON.parse(e.data).detail : "AI insight stream failed"));
+  });
+  return () => source.close();
+}
+
+/**
+ * Subscribe to live dataset changes pushed over /api/stream (SSE).
+ * @param {function} onChange - called with { type: "snapshot", resource, version, changed, removed }
+ *   or { type: "resync" } when every resource must be reloaded
+ * @returns {function} unsubscribe
+ */
+export function subscribeToChanges(onChange) {
+  if (typeof window === "undefined" || !window.EventSource) return () => {};
+  const source = new EventSource(makeUrl("/stream").toString());
+  source.addEventListener("snapshot", (e) => onChange(JSON.parse(e.data)));
+  // sent when the server can't replay what was missed (lagging client or restart)
+  source.addEventListener("resync", (e) => onChange(JSON.parse(e.data)));
+  return () => source.close();
+}
@@ -1,7 +1,8 @@
 // custom hook for managing SWAPI table data
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
+import { subscribeToChanges } from "./swapiClient";
 
-export function useSwapiTable(fetchFunction, defaultSortBy = "name") {
+export function useSwapiTable(fetchFunction, defaultSortBy = "name", resource = null) {
   const [items, setItems] = useState([]);
   const [page, setPage] = useState(1);
   const [total, setTotal] = useState(0);
@@ -9,11 +10,27 @@ export function useSwapiTable(fetchFunction, defaultSortBy = "name") {
   const [searchQuery, setSearchQuery] = useState("");
   const [sortBy, setSortBy] = useState(defaultSortBy);
   const [order, setOrder] = useState("asc");
+  const [version, setVersion] = useState(0);
+  const liveUpdate = useRef(false);
+
+  // Reload the current page when the backend pushes a change for this resource,
+  // or asks every client to resync
+  useEffect(() => {
+    if (!resource) return;
+    return subscribeToChanges((event) => {
+      if (event.type !== "resync" && event.resource !== resource) return;
+      liveUpdate.current = true;
+      setVersion((v) => v + 1);
+    });
+  }, [resource]);
 
   useEffect(() => {
     async function load() {
-      setLoading(true);
-      const minLoadingTime = 500; // ms
+      // live updates refresh in place, without skeleton rows or the minimum delay
+      const silent = liveUpdate.current;
+      liveUpdate.current = false;
+      if (!silent) setLoading(true);
+      const minLoadingTime = silent ? 0 : 500; // ms
       const start = Date.now();
 
       try {
@@ -39,7 +56,7 @@ export function useSwapiTable(fetchFunction, defaultSortBy = "name") {
       }
     }
     load();
-  }, [page, searchQuery, sortBy, order, fetchFunction]);
+  }, [page, searchQuery, sortBy, order, fetchFunction, version]);
 
   const handleSearch = (query) => {
     if (query === searchQuery) return;